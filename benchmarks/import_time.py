@@ -0,0 +1,117 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Fails if `import jsonschema_prompt` goes over its import-time budget
+# or pulls in modules that should only load when first needed; the same checks
+# run in tests/test_import_time.py.
+#
+#     python benchmarks/import_time.py [--budget-ms 100] [--runs 5]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGET_MS = 100.0
+
+LAZY_MODULES = [
+    "prompt_toolkit",
+    "jsonschema",
+    "jsonpointer",
+    "yaml",
+    "email",
+    "fastjsonschema",
+]
+
+# code to run -> modules it must not import
+LAZY_IMPORT_CHECKS = {
+    "import jsonschema_prompt": LAZY_MODULES,
+    # headless runs answered entirely from set values never touch the terminal
+    (
+        "from jsonschema_prompt import prompt, input\n"
+        "prompt({'type': 'object', 'properties': {'a': {'type': 'string'}}},"
+        " set_values={'/a': 'x'}, input_handler=input.HEADLESS_INPUT_HANDLER)"
+    ): ["prompt_toolkit", "yaml"],
+}
+
+
+def _run(code, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def get_import_time_us(module):
+    result = _run(f"import {module}", "-X", "importtime")
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, _, fields = line.partition(":")
+        parts = [p.strip() for p in fields.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def get_loaded_modules(code):
+    result = _run(
+        code + "\nimport sys\nprint('\\n'.join(sys.modules))",
+    )
+    return set(result.stdout.split())
+
+
+def get_median_import_time_ms(runs):
+    times = [get_import_time_us("jsonschema_prompt") / 1000 for _ in range(runs)]
+    return statistics.median(times)
+
+
+def get_lazy_import_failures():
+    failures = []
+    for code, lazy_modules in LAZY_IMPORT_CHECKS.items():
+        loaded = get_loaded_modules(code)
+        for module in lazy_modules:
+            if module in loaded:
+                failures.append(f"{module} imported by: {code.splitlines()[0]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+
+    import_time = get_median_import_time_ms(args.runs)
+    print(f"import jsonschema_prompt: {import_time:.1f} ms (budget {args.budget_ms} ms)")
+    if import_time > args.budget_ms:
+        failures.append(f"import took {import_time:.1f} ms")
+
+    failures.extend(get_lazy_import_failures())
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Drives prompt() with scripted answers over generated schemas, and reports the
+# time and peak memory per field (each value in the resulting document).
+# Fails if a case is slower or bigger per field than its stored baseline by
+# more than the tolerance, so scaling problems show up before a release.
+#
+#     python benchmarks/prompt_scaling.py [--case wide_object ...] [--scale 0.1]
+#         [--shallow-validation] [--runs 3] [--tolerance 2.0] [--update-baselines]
+#
+# Baselines are kept for each scale and validation mode they were recorded
+# with, and a case without one for the run's fails, rather than going
+# unchecked; record one with --update-baselines. Times are compared relative to a calibration
+# workload that doesn't use this package, timed just before each case, so
+# baselines recorded on one machine hold on faster or slower (or busier) ones.
+
+import argparse
+import dataclasses
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from jsonschema_prompt import prompt  # noqa: E402
+from jsonschema_prompt.testing import ScriptedAnswers  # noqa: E402
+from jsonschema_prompt.validator_cache import ValidatorCache  # noqa: E402
+
+BASELINES_PATH = os.path.join(ROOT, "benchmarks", "baselines.json")
+
+
+@dataclasses.dataclass
+class Case:
+    schema: Any
+    answers: List[Any]
+    fields: int
+    set_values: Optional[Dict[str, Any]] = None
+
+
+def wide_object(n: int) -> Case:
+    names = [f"property{i}" for i in range(n)]
+    schema = {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in names},
+        "required": names,
+        "additionalProperties": False,
+    }
+    return Case(schema, [f"value{i}" for i in range(n)], n)
+
+
+def deep_object(depth: int) -> Case:
+    schema = {"type": "string"}
+    for _ in range(depth):
+        schema = {
+            "type": "object",
+            "properties": {"child": schema},
+            "required": ["child"],
+            "additionalProperties": False,
+        }
+    return Case(schema, ["leaf"], depth + 1)
+
+
+def long_array(n: int) -> Case:
+    schema = {"type": "array", "items": {"type": "integer", "minimum": 0}}
+    return Case(schema, [str(i) for i in range(n)] + [EOFError], n)
+
+
+def large_enum(n: int) -> Case:
+    values = [f"value-{i:06d}" for i in range(n)]
+    schema = {"type": "array", "items": {"type": "string", "enum": values}}
+    answers = [values[(i * 7919) % n] for i in range(1000)]
+    return Case(schema, answers + [EOFError], len(answers))
+
+
+def many_set_values(n: int) -> Case:
+    names = [f"property{i}" for i in range(n)]
+    schema = {
+        "type": "object",
+        "properties": {
+            "settings": {
+                "type": "object",
+                "properties": {name: {"type": "integer"} for name in names},
+                "additionalProperties": False,
+            }
+        },
+        "required": ["settings"],
+        "additionalProperties": False,
+    }
+    set_values = {f"/settings/{name}": i for i, name in enumerate(names)}
+    return Case(schema, [], n, set_values)
+
+
+CASES: Dict[str, Callable[[float], Case]] = {
+    "wide_object": lambda scale: wide_object(int(10_000 * scale)),
+    "deep_object": lambda scale: deep_object(max(1, int(200 * scale))),
+    "long_array": lambda scale: long_array(int(100_000 * scale)),
+    "large_enum": lambda scale: large_enum(int(50_000 * scale)),
+    "many_set_values": lambda scale: many_set_values(int(10_000 * scale)),
+}
+
+
+def get_scripted_answers(case: Case) -> ScriptedAnswers:
+    # printed messages aren't kept, so they don't count towards peak memory
+    return ScriptedAnswers(case.answers, keep_printed=False)
+
+
+def run_case(case: Case, scripted: ScriptedAnswers, shallow_validation: bool) -> Any:
+    # a fresh cache each run, so compiling validators is part of the cost
+    value = prompt(
+        case.schema,
+        set_values=case.set_values,
+        input_handler=scripted.input_handler,
+        validator_cache=ValidatorCache(),
+        shallow_validation=shallow_validation,
+    )
+    if scripted.answers or scripted.rejected:
+        raise AssertionError(f"Answers left over or rejected: {scripted.rejected}")
+    return value
+
+
+def measure(case: Case, runs: int, shallow_validation: bool) -> Dict[str, float]:
+    times = []
+    for _ in range(runs):
+        scripted = get_scripted_answers(case)
+        gc.collect()
+        start = time.perf_counter()
+        run_case(case, scripted, shallow_validation)
+        times.append(time.perf_counter() - start)
+    scripted = get_scripted_answers(case)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run_case(case, scripted, shallow_validation)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "fields": case.fields,
+        "seconds": min(times),
+        "us_per_field": min(times) / case.fields * 1e6,
+        "peak_bytes_per_field": peak / case.fields,
+    }
+
+
+def calibrate(runs: int) -> float:
+    # microseconds for a fixed workload of jsonschema validation and JSON
+    # copying, the bulk of what prompting does
+    import jsonschema
+
+    names = [f"property{i}" for i in range(50)]
+    schema = {
+        "type": "object",
+        "properties": {name: {"type": "string", "maxLength": 20} for name in names},
+        "required": names,
+    }
+    document = {name: f"value-{name}" for name in names}
+    validator = jsonschema.Draft7Validator(schema)
+    times = []
+    for _ in range(max(runs, 3)):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(100):
+            validator.is_valid(json.loads(json.dumps(document)))
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e6
+
+
+def load_baselines() -> Dict[str, Dict[str, Dict[str, float]]]:
+    # case -> scale (and validation mode) -> baseline
+    try:
+        with open(BASELINES_PATH, "r") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(
+    name: str,
+    result: Dict[str, float],
+    baseline: Dict[str, float],
+    calibration_us: float,
+    tolerance: float,
+) -> List[str]:
+    failures = []
+    limits = {
+        "us_per_field": baseline["us_per_field"]
+        * calibration_us
+        / baseline["calibration_us"],
+        "peak_bytes_per_field": baseline["peak_bytes_per_field"],
+    }
+    for metric, limit in limits.items():
+        if result[metric] > limit * tolerance:
+            failures.append(
+                f"{name}: {metric} {result[metric]:.1f} is over "
+                f"{tolerance}x the baseline {limit:.1f}"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--case", action="append", choices=list(CASES))
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplies the size of every case"
+    )
+    parser.add_argument("--shallow-validation", action="store_true")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="Fail when a case is this many times its baseline per field",
+    )
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+    baselines = load_baselines()
+    # per-field costs are only comparable at the same size
+    scale_key = repr(args.scale) + (" shallow" if args.shallow_validation else "")
+    failures = []
+    print(
+        f"{'case':<18}{'fields':>8}{'total':>10}{'per field':>12}{'peak/field':>14}"
+        f"{'calibration':>14}"
+    )
+    for name in args.case or CASES:
+        case = CASES[name](args.scale)
+        calibration_us = calibrate(args.runs)
+        result = measure(case, args.runs, args.shallow_validation)
+        print(
+            f"{name:<18}{result['fields']:>8}{result['seconds']:>9.2f}s"
+            f"{result['us_per_field']:>10.1f}us{result['peak_bytes_per_field']:>13.0f}B"
+            f"{calibration_us / 1000:>12.1f}ms"
+        )
+        baseline = baselines.get(name, {}).get(scale_key)
+        if args.update_baselines:
+            baselines.setdefault(name, {})[scale_key] = {
+                "calibration_us": round(calibration_us, 1),
+                "us_per_field": round(result["us_per_field"], 2),
+                "peak_bytes_per_field": round(result["peak_bytes_per_field"]),
+            }
+        elif baseline is None:
+            failures.append(
+                f"{name}: no baseline for {scale_key!r}; "
+                "record one with --update-baselines"
+            )
+        else:
+            failures.extend(
+                compare(name, result, baseline, calibration_us, args.tolerance)
+            )
+
+    if args.update_baselines:
+        with open(BASELINES_PATH, "w") as fp:
+            json.dump(baselines, fp, indent=2, sort_keys=True)
+            fp.write("\n")
+    for failure in failures:
+        print("FAIL: " + failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares the validation backends: time to build a validator (cold, and from
+# the on-disk source cache) and to check valid and invalid documents.
+#
+#     python benchmarks/validation_backends.py [--schema-file schema.json]
+#         [--document doc.json] [--runs 2000]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jsonschema_prompt.backends import get_backend, BACKENDS  # noqa: E402
+from jsonschema_prompt.schema_cache import load_schema_file  # noqa: E402
+
+CONFIG_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "pattern": "^[a-z][a-z0-9-]*$", "maxLength": 64},
+        "region": {"type": "string", "enum": [f"region-{i}" for i in range(200)]},
+        "replicas": {"type": "integer", "minimum": 1, "maximum": 100},
+        "tags": {
+            "type": "object",
+            "additionalProperties": {"type": "string"},
+            "maxProperties": 50,
+        },
+        "services": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "port": {"type": "integer", "minimum": 1, "maximum": 65535},
+                    "public": {"type": "boolean"},
+                    "env": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["name", "port"],
+                "additionalProperties": False,
+            },
+            "uniqueItems": True,
+        },
+    },
+    "required": ["name", "region", "replicas"],
+    "additionalProperties": False,
+}
+
+CONFIG_DOCUMENT = {
+    "name": "my-app",
+    "region": "region-150",
+    "replicas": 3,
+    "tags": {f"tag{i}": f"value{i}" for i in range(20)},
+    "services": [
+        {"name": f"svc{i}", "port": 8000 + i, "public": i % 2 == 0, "env": ["A=1"]}
+        for i in range(20)
+    ],
+}
+
+
+def _invalidate(document):
+    if isinstance(document, dict):
+        return dict(document, **{"\u0000unexpected": None})
+    return None
+
+
+def _time(func, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schema-file")
+    parser.add_argument("--document", help="A valid document for the schema")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    schema, document = CONFIG_SCHEMA, CONFIG_DOCUMENT
+    if args.schema_file:
+        schema = load_schema_file(args.schema_file, use_cache=False).schema
+        if not args.document:
+            parser.exit(1, "--document is required with --schema-file\n")
+    if args.document:
+        with open(args.document) as fp:
+            document = json.load(fp)
+    invalid_document = _invalidate(document)
+
+    print(f"{'backend':<16}{'build':>12}{'cached build':>14}{'valid':>12}{'invalid':>12}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in BACKENDS:
+            try:
+                get_backend(name)
+            except ValueError as e:
+                print(f"{name:<16}skipped: {e}")
+                continue
+            start = time.perf_counter()
+            validator = get_backend(name, cache_dir=cache_dir).create_validator(schema)
+            build = time.perf_counter() - start
+            # a new backend instance only has the on-disk cache to draw on
+            start = time.perf_counter()
+            get_backend(name, cache_dir=cache_dir).create_validator(schema)
+            cached_build = time.perf_counter() - start
+
+            assert not list(validator.iter_errors(document)), "document is not valid"
+            valid = _time(lambda: list(validator.iter_errors(document)), args.runs)
+            invalid = _time(
+                lambda: list(validator.iter_errors(invalid_document)), args.runs // 10 or 1
+            )
+            print(
+                f"{name:<16}{build * 1000:>10.2f}ms{cached_build * 1000:>12.2f}ms"
+                f"{valid * 1e6:>10.1f}us{invalid * 1e6:>10.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -14,31 +14,72 @@
 
 import typing
 
-import jsonpointer
+from . import prompter, context, utils, input, types, plan
+from .exceptions import SetValueError, PromptValidationError, MissingAnswerError
+from .set_values import merge_set_values
+from .validator_cache import ValidatorCache, DEFAULT_VALIDATOR_CACHE
+from .refs import SchemaResolver
+from .backends import ValidationBackend, get_backend
 
-from . import prompter, context, utils, input, types
-from .exceptions import SetValueError
+if typing.TYPE_CHECKING:
+    from .sinks import OutputSink
+
+
+def compile(schema: types.SchemaType) -> plan.CompiledSchema:
+    return plan.compile_schema(schema)
 
 
 def prompt(
-    schema: types.SchemaType, *, prompt_text: typing.Optional[str]=None, set_values: typing.Mapping = None
+    schema: typing.Union[types.SchemaType, plan.CompiledSchema],
+    *,
+    prompt_text: typing.Optional[str] = None,
+    set_values: typing.Mapping = None,
+    validator_cache: typing.Optional[ValidatorCache] = DEFAULT_VALIDATOR_CACHE,
+    input_handler: typing.Optional[input.InputHandler] = None,
+    hooks: typing.Iterable[typing.Callable] = (),
+    sink: typing.Optional["OutputSink"] = None,
+    validation_backend: typing.Optional[ValidationBackend] = None,
+    accept_defaults: bool = False,
+    shallow_validation: bool = False,
+    full_validation: bool = False,
 ) -> typing.Any:
+    compiled_schema = None
+    if isinstance(schema, plan.CompiledSchema):
+        compiled_schema = schema
+        schema = compiled_schema.schema
+        resolver = compiled_schema.resolver
+    else:
+        resolver = SchemaResolver(schema)
     default_context = context.Context(
-        input_handler=input.DEFAULT_INPUT_HANDLER, values=set_values
+        input_handler=input_handler or input.DEFAULT_INPUT_HANDLER,
+        values=set_values,
+        validator_cache=validator_cache,
+        compiled_schema=compiled_schema,
+        resolver=resolver,
+        hooks=hooks,
+        sink=sink,
+        validation_backend=validation_backend,
+        accept_defaults=accept_defaults,
+        shallow_validation=shallow_validation,
+        full_validation=full_validation,
     )
     result = prompter.prompt_from_schema(prompt_text, schema, context=default_context)
-    for path, value in default_context.values.items():
-        try:
-            result_value = path.get(result)
-            if isinstance(result_value, jsonpointer.EndOfList):
-                path.set(result, value)
-            elif result_value != value:
-                raise SetValueError(
-                    path, value, f"Mismatch with existing value {result_value!r}"
-                )
-        except jsonpointer.JsonPointerException:
-            try:
-                path.set(result, value)
-            except jsonpointer.JsonPointerException as e:
-                raise SetValueError(path, value, str(e))
+    if default_context.items_streamed:
+        # the root array's items went to the sink as they were entered
+        append_node = default_context.values.get_child("-")
+        if append_node is not None and append_node.has_value:
+            sink.write(append_node.value)
+        return None
+    merge_set_values(result, default_context.values)
+    if sink is not None:
+        sink.write(result)
     return result
+
+
+def __getattr__(name):
+    # asyncio is only imported for callers that use the async API
+    if name == "prompt_async":
+        from .async_prompt import prompt_async
+
+        return prompt_async
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -13,40 +13,162 @@
 # limitations under the License.
 
 import argparse
+import dataclasses
 import sys
 import json
 
-try:
-    import yaml
-
-    loads = yaml.safe_load
-    loadf = yaml.safe_load
-except ModuleNotFoundError:
-    loads = json.loads
-    loadf = json.load
-
-from . import prompt, SetValueError
+from . import prompt, input, SetValueError
+from .exceptions import PromptValidationError, ReplayError
+from .schema_cache import parse_schema, load_schema_file
+from .sinks import get_sink, FORMATS, NDJSON
+from .backends import get_backend, BACKENDS, JSONSCHEMA
 
 parser = argparse.ArgumentParser()
 group = parser.add_mutually_exclusive_group()
 group.add_argument("--schema")
-group.add_argument("--schema-file", type=argparse.FileType("r"))
+group.add_argument("--schema-file")
 parser.add_argument("--set", nargs=2, action="append")
+parser.add_argument(
+    "--no-echo-schema",
+    action="store_true",
+    help="Don't print the schema loaded from --schema-file",
+)
+parser.add_argument(
+    "--no-schema-cache",
+    action="store_true",
+    help="Don't use the on-disk cache of parsed schema files",
+)
+parser.add_argument(
+    "--validation-backend",
+    choices=BACKENDS,
+    default=JSONSCHEMA,
+    help=(
+        "Engine used to validate values; fastjsonschema compiles each schema to "
+        "Python code, cached on disk (default: %(default)s)"
+    ),
+)
+parser.add_argument(
+    "--accept-defaults",
+    action="store_true",
+    help="Use each property's default instead of prompting for it",
+)
+parser.add_argument(
+    "--shallow-validation",
+    action="store_true",
+    help=(
+        "Check each object and array only against its own keywords, as the "
+        "values beneath it were already checked, rather than validating it whole"
+    ),
+)
+parser.add_argument(
+    "--full-validation",
+    action="store_true",
+    help=(
+        "With --shallow-validation, validate the whole document once more when "
+        "it is complete"
+    ),
+)
+parser.add_argument(
+    "--answers",
+    type=argparse.FileType("r"),
+    help="Fill one document per line of this NDJSON file without prompting",
+)
+parser.add_argument(
+    "--serve",
+    metavar="ADDRESS",
+    help=(
+        "Serve prompt sessions for the schema over a socket (unix:PATH or HOST:PORT), "
+        "one per connection, speaking JSON lines"
+    ),
+)
+parser.add_argument(
+    "--jobs", type=int, help="Number of worker processes for --answers"
+)
+parser.add_argument(
+    "--validate-while-typing",
+    action="store_true",
+    help="Show the first validation error while typing, checked in the background",
+)
+parser.add_argument(
+    "--bulk",
+    action="store_true",
+    help="Offer to paste or load many array items at once before prompting for each",
+)
+parser.add_argument(
+    "--trace",
+    type=argparse.FileType("w"),
+    help="Write a Chrome trace of the session, with per-path latency histograms",
+)
+parser.add_argument(
+    "--output",
+    type=argparse.FileType("w"),
+    help=(
+        "Write the document to this file instead of stdout; "
+        "a top-level array is written item by item as it is entered"
+    ),
+)
+parser.add_argument(
+    "--output-format",
+    choices=FORMATS,
+    default=NDJSON,
+    help="Format for --output (default: %(default)s)",
+)
+journal_group = parser.add_mutually_exclusive_group()
+journal_group.add_argument(
+    "--journal",
+    help="Write each value to this journal as it is entered, for use with --resume",
+)
+journal_group.add_argument(
+    "--resume",
+    help=(
+        "Continue the session recorded in this journal, "
+        "and keep journaling to it"
+    ),
+)
+session_group = parser.add_mutually_exclusive_group()
+session_group.add_argument(
+    "--record",
+    type=argparse.FileType("w"),
+    help="Write a transcript of the prompts and answers to this file",
+)
+session_group.add_argument(
+    "--replay",
+    type=argparse.FileType("r"),
+    help="Answer the prompts from a transcript written by --record",
+)
 args = parser.parse_args()
 
 if not (args.schema or args.schema_file):
     parser.exit("Must specify --schema or --schema-file")
+
+
 if args.schema:
     try:
-        schema = loads(args.schema)
+        schema = parse_schema(args.schema)
     except Exception as e:
         parser.exit(f"Error parsing schema: {e}")
 if args.schema_file:
     try:
-        schema = loadf(args.schema_file)
-        print("Schema: " + json.dumps(schema) + "\n")
+        loaded_schema = load_schema_file(
+            args.schema_file, use_cache=not args.no_schema_cache, with_plan=True
+        )
     except Exception as e:
         parser.exit(f"Error loading file: {e}")
+    if not (args.answers or args.no_echo_schema):
+        print("Schema: " + json.dumps(loaded_schema.schema) + "\n")
+    # prompt() runs the cached plan in place of the schema
+    schema = loaded_schema.compiled_schema
+
+try:
+    validation_backend = get_backend(
+        args.validation_backend, use_cache=not args.no_schema_cache
+    )
+except ValueError as e:
+    parser.exit(f"Error: {e}")
+
+sink = None
+if args.output:
+    sink = get_sink(args.output, args.output_format)
 
 values = {}
 for key, value in args.set or []:
@@ -56,11 +178,128 @@ for key, value in args.set or []:
         pass
     values[key] = value
 
+if args.serve:
+    import asyncio
+    from .server import PromptServer
+
+    server = PromptServer(
+        {"default": schema},
+        validation_backend=validation_backend,
+        set_values=values,
+        accept_defaults=args.accept_defaults,
+        shallow_validation=args.shallow_validation,
+        full_validation=args.full_validation,
+    )
+    try:
+        asyncio.run(server.serve_forever(args.serve))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    sys.exit(0)
+
+if args.answers:
+    from .batch import fill_documents, read_answers
+
+    failed = False
+    try:
+        for result in fill_documents(
+            schema,
+            read_answers(args.answers),
+            set_values=values,
+            processes=args.jobs,
+            validation_backend=args.validation_backend,
+            accept_defaults=args.accept_defaults,
+            shallow_validation=args.shallow_validation,
+        ):
+            if result.error is not None:
+                failed = True
+                print(f"ERROR: answer {result.index + 1}: {result.error}", file=sys.stderr)
+            elif sink is not None:
+                sink.write(result.value)
+            else:
+                print(json.dumps(result.value), flush=True)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sink is not None:
+            sink.close()
+    sys.exit(1 if failed else 0)
+
+# plain line-by-line prompts on stderr when piped, so no terminal setup is needed
+input_handler = input.get_default_input_handler()
+if args.validate_while_typing:
+    input_handler = dataclasses.replace(input_handler, validate_while_typing=True)
+if args.bulk:
+    input_handler = dataclasses.replace(input_handler, bulk_items=True)
+transcript = None
+if args.record or args.replay:
+    from .transcript import Transcript, record_input_handler, replay_input_handler
+
+    if args.record:
+        transcript = Transcript()
+        input_handler = record_input_handler(input_handler, transcript)
+    else:
+        input_handler = replay_input_handler(
+            input_handler, Transcript.load(args.replay)
+        )
+# messages are written together when the next prompt is shown
+printer = input.BufferedPrinter(input_handler.print_handler)
+input_handler = printer.wrap(input_handler)
+
+hooks = []
+journal = None
+if args.journal or args.resume:
+    from .journal import Journal, load_journal
+
+    if args.resume:
+        try:
+            # values given with --set take precedence over the journal
+            values = dict(load_journal(args.resume), **values)
+        except ValueError as e:
+            parser.exit(f"Error loading journal: {e}")
+    journal = Journal.open(args.journal or args.resume, append=bool(args.resume))
+    hooks.append(journal)
+
+trace_sink = None
+if args.trace:
+    from .trace import ChromeTraceSink
+
+    trace_sink = ChromeTraceSink()
+    hooks.append(trace_sink)
+
 try:
-    value = prompt(schema, set_values=values)
-    print(json.dumps(value, indent=2))
-except SetValueError as e:
+    value = prompt(
+        schema,
+        set_values=values,
+        input_handler=input_handler,
+        hooks=hooks,
+        sink=sink,
+        validation_backend=validation_backend,
+        accept_defaults=args.accept_defaults,
+        shallow_validation=args.shallow_validation,
+        full_validation=args.full_validation,
+    )
+    printer.flush()
+    if sink is None:
+        print(json.dumps(value, indent=2))
+except (SetValueError, PromptValidationError, ReplayError) as e:
     print(f"ERROR: {e}", file=sys.stderr)
     sys.exit(1)
 except KeyboardInterrupt:
     pass
+finally:
+    printer.flush()
+    if sink is not None:
+        sink.close()
+    if journal is not None:
+        journal.close()
+    if trace_sink is not None:
+        trace_sink.dump(args.trace)
+        args.trace.close()
+    if transcript is not None:
+        transcript.dump(args.record)
+        args.record.close()
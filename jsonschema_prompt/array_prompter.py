@@ -14,36 +14,79 @@
 
 import itertools
 import dataclasses
-from typing import List, Optional
+import json
+from typing import Tuple, Optional, Any, Dict, Hashable, List
 import textwrap
 
-import jsonschema
-
 from .types import SchemaType
 from .context import Context
-from .utils import find_types_in_schema, ALL_JSON_TYPES
-from .prompter import prompt_from_types, prompt_from_schema, PromptText
+from .events import RESET, VALUE_IMPORTED
+from .exceptions import PromptValidationError, SetValueError
+from .set_values import merge_set_values
+from .utils import (
+    find_types_in_schema,
+    get_shallow_schema,
+    multiline_continuation,
+    ALL_JSON_TYPES,
+)
+from .prompter import prompt_from_types, prompt_from_schema, use_set_value, PromptText
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class _AdditionalItemsData:
     allowed: bool
     schema: SchemaType
-    types: List[str]
+    types: Tuple[str, ...]
 
 
 @dataclasses.dataclass(frozen=True)
 class _ArraySchemaData:
     min_items: Optional[int]
     max_items: Optional[int]
-    indexed_items: Optional[List[SchemaType]]
+    indexed_items: Tuple[SchemaType, ...]
     additional_items: _AdditionalItemsData
+    unique_items: bool = False
+    contains: Optional[SchemaType] = None
+    # the schema for the final check of the whole array
+    final_schema: Optional[SchemaType] = None
+    # the same, without the keywords for the items, which were checked as entered
+    shallow_schema: Optional[SchemaType] = None
+    # whether every keyword is enforced as the items are entered, so the items
+    # can be streamed without keeping them for a final check
+    streamable: bool = True
+
+
+# keywords that constrain the array as a whole, which the item checker can't
+# enforce incrementally
+_WHOLE_ARRAY_KEYWORDS = frozenset(
+    ["allOf", "anyOf", "oneOf", "not", "if", "then", "else", "const", "enum"]
+)
+
+_INDEXED_ITEM_PROMPT_TEXT = PromptText(
+    fixed_type=f"Enter a value [$type]: ",
+    selected_type=f"Enter a value: ",
+)
+
+
+def _get_additional_item_prompt_text(over_min_length: bool) -> PromptText:
+    end_text = " (CTRL+D to finish)" if over_min_length else ""
+    return PromptText(
+        fixed_type=f"Enter a value [$type]{end_text}: ",
+        selected_type=f"Enter a value: ",
+        type_prompt_text=f"Enter a type{end_text}: ",
+    )
+
 
+_ADDITIONAL_ITEM_PROMPT_TEXTS = {
+    True: _get_additional_item_prompt_text(True),
+    False: _get_additional_item_prompt_text(False),
+}
 
-def _get_additional_items_data(schema: SchemaType, default_allowed: bool):
+
+def _get_additional_items_data(schema: SchemaType, default_allowed: bool, resolver=None):
     if "additionalItems" not in schema:
         return _AdditionalItemsData(
-            allowed=default_allowed, schema={}, types=ALL_JSON_TYPES
+            allowed=default_allowed, schema={}, types=tuple(ALL_JSON_TYPES)
         )
     additional_items = schema["additionalItems"]
     if isinstance(additional_items, dict):
@@ -52,26 +95,41 @@ def _get_additional_items_data(schema: SchemaType, default_allowed: bool):
         return _AdditionalItemsData(
             allowed=True,
             schema=additional_items,
-            types=find_types_in_schema(additional_items),
+            types=tuple(find_types_in_schema(additional_items, resolver)),
         )
     else:
         # print("add'l items bool")
         # add'l items set to a boolean
         assert isinstance(additional_items, bool)
         return _AdditionalItemsData(
-            allowed=additional_items, schema={}, types=ALL_JSON_TYPES
+            allowed=additional_items, schema={}, types=tuple(ALL_JSON_TYPES)
         )
 
 
-def _get_array_schema_data(schema):
+def _get_array_schema_data(schema, resolver=None):
     min_items = schema.get("minItems")
     max_items = schema.get("maxItems")
+    unique_items = schema.get("uniqueItems", False) is True
+    contains = schema.get("contains")
+    final_schema = schema
+    if unique_items:
+        # enforced by hash as items are entered; jsonschema's check is quadratic
+        final_schema = {k: v for k, v in schema.items() if k != "uniqueItems"}
+    shallow_schema = get_shallow_schema(final_schema)
+    streamable = _WHOLE_ARRAY_KEYWORDS.isdisjoint(schema)
     if "items" not in schema:
         return _ArraySchemaData(
             min_items=min_items,
             max_items=max_items,
-            indexed_items=[],
-            additional_items=_get_additional_items_data(schema, default_allowed=True),
+            indexed_items=(),
+            additional_items=_get_additional_items_data(
+                schema, default_allowed=True, resolver=resolver
+            ),
+            unique_items=unique_items,
+            contains=contains,
+            final_schema=final_schema,
+            shallow_schema=shallow_schema,
+            streamable=streamable,
         )
     items = schema["items"]
     if not isinstance(items, list):
@@ -80,20 +138,87 @@ def _get_array_schema_data(schema):
         return _ArraySchemaData(
             min_items=min_items,
             max_items=max_items,
-            indexed_items=[],
+            indexed_items=(),
             additional_items=_AdditionalItemsData(
-                allowed=True, schema=items, types=find_types_in_schema(items)
+                allowed=True,
+                schema=items,
+                types=tuple(find_types_in_schema(items, resolver)),
             ),
+            unique_items=unique_items,
+            contains=contains,
+            final_schema=final_schema,
+            shallow_schema=shallow_schema,
+            streamable=streamable,
         )
 
     return _ArraySchemaData(
         min_items=min_items,
         max_items=max_items,
-        indexed_items=items,
-        additional_items=_get_additional_items_data(schema, default_allowed=False),
+        indexed_items=tuple(items),
+        additional_items=_get_additional_items_data(
+            schema, default_allowed=False, resolver=resolver
+        ),
+        unique_items=unique_items,
+        contains=contains,
+        final_schema=final_schema,
+        shallow_schema=shallow_schema,
+        streamable=streamable,
     )
 
 
+def _get_item_key(value: Any) -> Hashable:
+    # equal JSON values get equal keys: 1 and 1.0 are the same item, 1 and true are not
+    if isinstance(value, bool):
+        return (bool, value)
+    if isinstance(value, (int, float)):
+        return (float, value)
+    if isinstance(value, list):
+        return (list, tuple(_get_item_key(v) for v in value))
+    if isinstance(value, dict):
+        return (dict, frozenset((k, _get_item_key(v)) for k, v in value.items()))
+    return (type(value), value)
+
+
+class _ItemChecker:
+    def __init__(self, data: _ArraySchemaData, context: Context) -> None:
+        self.data = data
+        self.item_indexes: Dict[Hashable, int] = {}
+        self.contains_validator = None
+        if data.contains is not None:
+            self.contains_validator = context.get_validator(data.contains)
+        self.contains_satisfied = False
+
+    def check_item(self, value: Any) -> Optional[str]:
+        if self.data.unique_items:
+            key = _get_item_key(value)
+            if key in self.item_indexes:
+                return f"{value!r} is a duplicate of item {self.item_indexes[key]}"
+        return None
+
+    def add_item(self, index: int, value: Any) -> None:
+        if self.data.unique_items:
+            self.item_indexes.setdefault(_get_item_key(value), index)
+        if self.contains_validator is not None and not self.contains_satisfied:
+            self.contains_satisfied = self.contains_validator.is_valid(value)
+
+    def get_finish_errors(self, length: int) -> List[str]:
+        errors = []
+        if self.data.min_items is not None and length < self.data.min_items:
+            errors.append(f"Array requires at least {self.data.min_items} items")
+        if self.contains_validator is not None and not self.contains_satisfied:
+            errors.append(
+                "Array requires an item matching the \"contains\" schema"
+            )
+        return errors
+
+    def can_add_items(self, length: int) -> bool:
+        if length < len(self.data.indexed_items):
+            return True
+        if self.data.max_items is not None and length >= self.data.max_items:
+            return False
+        return self.data.additional_items.allowed
+
+
 class _BreakLoop(Exception):
     pass
 
@@ -101,25 +226,31 @@ class _BreakLoop(Exception):
 def _do_loop(*, index: int, data: _ArraySchemaData, context: Context):
     over_min_length = data.min_items is None or index >= data.min_items
     over_max_length = data.max_items is not None and index >= data.max_items
+    value_node = context.get_child_value_node(index)
     if index < len(data.indexed_items):
         item_schema = data.indexed_items[index]
-        prompt_text = PromptText(
-            fixed_type=f"Enter a value [$type]: ",
-            selected_type=f"Enter a value: ",
-        )
+        if value_node is not None:
+            return use_set_value(
+                item_schema,
+                value_node,
+                input_handler=context.child_input_handler,
+                context=context,
+            )
         return prompt_from_schema(
-            prompt_text, item_schema, context=context.subcontext(index)
+            _INDEXED_ITEM_PROMPT_TEXT, item_schema, context=context.subcontext(index)
         )
     elif over_max_length or not data.additional_items.allowed:
         raise _BreakLoop
     else:
         item_schema = data.additional_items.schema
-        end_text = " (CTRL+D to finish)" if over_min_length else ""
-        prompt_text = PromptText(
-            fixed_type=f"Enter a value [$type]{end_text}: ",
-            selected_type=f"Enter a value: ",
-            type_prompt_text=f"Enter a type{end_text}: ",
-        )
+        if value_node is not None:
+            return use_set_value(
+                item_schema,
+                value_node,
+                input_handler=context.child_input_handler,
+                context=context,
+            )
+        prompt_text = _ADDITIONAL_ITEM_PROMPT_TEXTS[over_min_length]
         try:
             return prompt_from_schema(
                 prompt_text,
@@ -130,31 +261,182 @@ def _do_loop(*, index: int, data: _ArraySchemaData, context: Context):
             raise _BreakLoop
 
 
-def prompt_array(prompt_text, schema: SchemaType, *, context: Context):
-    validator = context.get_validator(schema)
+def _print_errors(context: Context, errors: List[str], message: str) -> None:
+    indented_input_handler = context.input_handler.with_indent()
+    indented_input_handler.print("\n".join(errors), color="#ff0000", indent=True)
+    indented_input_handler.print(message, color="#ff0000", indent=True)
 
-    array_schema_data = _get_array_schema_data(schema)
+
+def parse_bulk_items(text: str) -> list:
+    text = text.strip()
+    if text.startswith("@"):
+        try:
+            with open(text[1:].strip(), "r") as fp:
+                text = fp.read().strip()
+        except OSError as e:
+            raise ValueError(f"Error reading {text[1:].strip()}: {e}")
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON array: {e}")
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array")
+        return items
+    lines = [line for line in text.splitlines() if line.strip()]
+    try:
+        # parsing the lines as one array is much faster than line by line
+        return json.loads("[" + ",".join(lines) + "]")
+    except json.JSONDecodeError:
+        pass
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+    raise ValueError("Invalid JSON lines")
+
+
+_MAX_BULK_ERRORS = 20
+
+
+def _check_bulk_items(items: list, data: _ArraySchemaData, context: Context) -> List[str]:
+    errors = []
+    max_items = data.max_items
+    if not data.additional_items.allowed:
+        max_items = len(data.indexed_items)
+        if data.max_items is not None:
+            max_items = min(max_items, data.max_items)
+    if max_items is not None and len(items) > max_items:
+        errors.append(f"Array allows at most {max_items} items, got {len(items)}")
+    validators = {}
+    item_indexes = {}
+    for index, item in enumerate(items):
+        if index < len(data.indexed_items):
+            item_schema = data.indexed_items[index]
+        else:
+            item_schema = data.additional_items.schema
+        validator = validators.get(id(item_schema))
+        if validator is None:
+            validator = validators[id(item_schema)] = context.get_validator(item_schema)
+        errors.extend(f"Item {index}: {e.message}" for e in validator.iter_errors(item))
+        if data.unique_items:
+            key = _get_item_key(item)
+            if key in item_indexes:
+                errors.append(f"Item {index}: duplicate of item {item_indexes[key]}")
+            else:
+                item_indexes[key] = index
+        if len(errors) > _MAX_BULK_ERRORS:
+            break
+    if len(errors) > _MAX_BULK_ERRORS:
+        errors[_MAX_BULK_ERRORS:] = ["..."]
+    return errors
+
+
+def _prompt_bulk_items(data: _ArraySchemaData, context: Context) -> list:
+    from .validators import BulkItemsValidator
+
+    validator = BulkItemsValidator(
+        parse_bulk_items, lambda items: _check_bulk_items(items, data, context)
+    )
+    context.child_input_handler.print_instructions(
+        "Paste the items as a JSON array or one JSON value per line, or enter "
+        "@filename to load them from a file. Press ESC then ENTER to finish, "
+        "or leave empty to enter the items one at a time."
+    )
+    text = context.child_input_handler.get_string(
+        message="Items: ",
+        validator=validator,
+        validate_while_typing=False,
+        multiline=True,
+        prompt_continuation=multiline_continuation,
+    )
+    if not text.strip():
+        return []
+    return validator.parse(text)
+
+
+def _prompt_items(data: _ArraySchemaData, context: Context) -> list:
+    array = []
+    length = 0
+    checker = _ItemChecker(data, context)
+    sink = context.get_item_sink() if data.streamable else None
+
+    def add_item(value):
+        nonlocal length
+        checker.add_item(length, value)
+        length += 1
+        if sink is None:
+            array.append(value)
+            return
+        # streamed items aren't kept, so their set values are merged now
+        values_node = context.get_value_node()
+        item_node = values_node.get_child(length - 1) if values_node is not None else None
+        if item_node:
+            merge_set_values(value, item_node)
+        sink.write(value)
+
+    input_handler = context.input_handler
+    if input_handler.bulk_items and input_handler.interactive and not context.get_value_node():
+        for value in _prompt_bulk_items(data, context):
+            if context.hooks:
+                context.subcontext(length).emit(VALUE_IMPORTED, value=value)
+            add_item(value)
+
+    while True:
+        index = length
+        try:
+            value = _do_loop(index=index, data=data, context=context)
+        except _BreakLoop:
+            errors = checker.get_finish_errors(index)
+            if errors and sink is not None and not checker.can_add_items(index):
+                # streamed items are gone, so the array can't be reset
+                raise PromptValidationError(context.path, array, errors)
+            if not errors or not checker.can_add_items(index):
+                # anything left over is reported by the full validation
+                return array
+            if not context.input_handler.interactive:
+                raise PromptValidationError(context.path, array, errors)
+            _print_errors(context, errors, "Enter more items")
+            continue
+        error = checker.check_item(value)
+        if error:
+            value_node = context.get_child_value_node(index)
+            if value_node is not None:
+                raise SetValueError(context.subcontext(index).path, value, error)
+            if not context.input_handler.interactive:
+                raise PromptValidationError(context.subcontext(index).path, value, [error])
+            _print_errors(context, [error], f"Re-enter item {index}")
+            # the rejected item was journaled when it was entered
+            context.subcontext(index).emit(RESET)
+            continue
+        add_item(value)
+
+
+def prompt_array(prompt_text, schema: SchemaType, *, context: Context):
+    array_schema_data = context.get_schema_plan(schema).array_data
+    validator = context.get_own_validator(
+        array_schema_data.final_schema, array_schema_data.shallow_schema
+    )
 
     if prompt_text:
         context.input_handler.print(prompt_text, indent=True)
 
+    if context.get_item_sink() is not None and array_schema_data.streamable:
+        # each item is checked as it is entered, and the array keywords are
+        # enforced incrementally, so there is nothing left to validate; otherwise
+        # the array is kept and written to the sink once it has been validated
+        context.set_items_streamed()
+        return _prompt_items(array_schema_data, context)
+
     while True:
-        array = []
-        for index in itertools.count():
-            try:
-                value = _do_loop(index=index, data=array_schema_data, context=context)
-                array.append(value)
-            except _BreakLoop:
-                break
-
-        errors = [e.message for e in validator.iter_errors(array)]
+        array = _prompt_items(array_schema_data, context)
+
+        errors = context.get_errors(validator, array)
+        if errors and not context.input_handler.interactive:
+            raise PromptValidationError(context.path, array, errors)
         if errors:
-            indented_input_handler = context.input_handler.with_indent()
-            indented_input_handler.print(
-                "\n".join(errors), color="#ff0000", indent=True
-            )
-            indented_input_handler.print(
-                "Array has been reset", color="#ff0000", indent=True
-            )
+            _print_errors(context, errors, "Array has been reset")
+            context.emit(RESET)
         else:
             return array
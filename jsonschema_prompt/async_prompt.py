@@ -0,0 +1,213 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# The prompters walk the schema synchronously on a worker thread, so validator
+# compilation and schema loading never run on the event loop. Each input
+# request is handed back to the loop as a coroutine, where it runs alongside
+# everything else the loop is doing.
+#
+# The worker thread is held for the whole session, mostly blocked waiting for
+# input. The prompters, the input handler wrappers (hooks, transcripts,
+# buffered printing) and custom prompters are all synchronous and recursive,
+# and reading input without a thread would need a second, async copy of every
+# one of them. Without an executor each session gets a thread of its own, so
+# sessions don't queue behind each other or behind other users of the loop's
+# default executor.
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Optional, Union
+
+from . import prompt
+from .input import InputHandler
+from .backends import ValidationBackend
+from .plan import CompiledSchema, compile_schema
+from .sinks import OutputSink
+from .types import SchemaType
+from .validator_cache import ValidatorCache, DEFAULT_VALIDATOR_CACHE
+
+
+async def _prompt_async(**kwargs):
+    from prompt_toolkit import PromptSession
+
+    return await PromptSession().prompt_async(**kwargs)
+
+
+async def _confirm_async(*, message, **kwargs):
+    from prompt_toolkit.shortcuts import create_confirm_session
+
+    return await create_confirm_session(message, **kwargs).prompt_async()
+
+
+async def _print_formatted_text_async(*args, **kwargs):
+    from prompt_toolkit.shortcuts import print_formatted_text
+
+    print_formatted_text(*args, **kwargs)
+
+
+class LoopBridge:
+    def __init__(
+        self, async_input_handler: "AsyncInputHandler", loop: asyncio.AbstractEventLoop
+    ) -> None:
+        self.loop = loop
+        self.cancelled = False
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.input_handler = InputHandler(
+            str_handler=self._run_on_loop(async_input_handler.str_handler),
+            bool_handler=self._run_on_loop(async_input_handler.bool_handler),
+            print_handler=self._run_on_loop(async_input_handler.print_handler),
+            indent_width=async_input_handler.indent_width,
+            validate_while_typing=async_input_handler.validate_while_typing,
+            bulk_items=async_input_handler.bulk_items,
+        )
+
+    def _run_on_loop(self, handler):
+        def sync_handler(*args, **kwargs):
+            with self._lock:
+                if self.cancelled:
+                    raise concurrent.futures.CancelledError
+                future = asyncio.run_coroutine_threadsafe(
+                    handler(*args, **kwargs), self.loop
+                )
+                self._pending.add(future)
+            try:
+                return future.result()
+            finally:
+                with self._lock:
+                    self._pending.discard(future)
+
+        return sync_handler
+
+    def cancel(self) -> None:
+        # unblocks the worker thread at its current or next input request
+        with self._lock:
+            self.cancelled = True
+            for future in self._pending:
+                future.cancel()
+
+
+def _start_thread(loop: asyncio.AbstractEventLoop, func: Callable) -> asyncio.Future:
+    future = loop.create_future()
+
+    def set_result(result):
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exception):
+        if not future.done():
+            future.set_exception(exception)
+
+    def run():
+        try:
+            result = func()
+        except BaseException as e:
+            callback, value = set_exception, e
+        else:
+            callback, value = set_result, result
+        try:
+            loop.call_soon_threadsafe(callback, value)
+        except RuntimeError:
+            # the loop has been closed
+            pass
+
+    threading.Thread(target=run, name="prompt-session", daemon=True).start()
+    return future
+
+
+@dataclasses.dataclass(frozen=True)
+class AsyncInputHandler:
+    str_handler: Callable[..., Awaitable[Any]]
+    bool_handler: Callable[..., Awaitable[Any]]
+    print_handler: Callable[[Any], Awaitable[Any]]
+    indent_width: int = 2
+    validate_while_typing: bool = False
+    bulk_items: bool = False
+
+    def bridge(self, loop: asyncio.AbstractEventLoop) -> LoopBridge:
+        return LoopBridge(self, loop)
+
+
+DEFAULT_ASYNC_INPUT_HANDLER = AsyncInputHandler(
+    str_handler=_prompt_async,
+    bool_handler=_confirm_async,
+    print_handler=_print_formatted_text_async,
+)
+
+
+async def prompt_async(
+    schema: Union[SchemaType, CompiledSchema],
+    *,
+    prompt_text: Optional[str] = None,
+    set_values: Mapping = None,
+    validator_cache: Optional[ValidatorCache] = DEFAULT_VALIDATOR_CACHE,
+    input_handler: Optional[AsyncInputHandler] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    hooks: Iterable[Callable] = (),
+    sink: Optional[OutputSink] = None,
+    validation_backend: Optional[ValidationBackend] = None,
+    accept_defaults: bool = False,
+    shallow_validation: bool = False,
+    full_validation: bool = False,
+) -> Any:
+    loop = asyncio.get_running_loop()
+    bridge = (input_handler or DEFAULT_ASYNC_INPUT_HANDLER).bridge(loop)
+    func = functools.partial(
+        prompt,
+        schema,
+        prompt_text=prompt_text,
+        set_values=set_values,
+        validator_cache=validator_cache,
+        input_handler=bridge.input_handler,
+        hooks=hooks,
+        sink=sink,
+        validation_backend=validation_backend,
+        accept_defaults=accept_defaults,
+        shallow_validation=shallow_validation,
+        full_validation=full_validation,
+    )
+    if executor is None:
+        worker = _start_thread(loop, func)
+    else:
+        worker = loop.run_in_executor(executor, func)
+    try:
+        return await asyncio.shield(worker)
+    except asyncio.CancelledError:
+        bridge.cancel()
+        try:
+            await worker
+        except BaseException:
+            pass
+        raise
+
+
+async def compile_async(
+    schema: SchemaType, *, executor: Optional[concurrent.futures.Executor] = None
+) -> CompiledSchema:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, compile_schema, schema)
+
+
+async def load_schema_file_async(
+    path: str, *, executor: Optional[concurrent.futures.Executor] = None, **kwargs
+):
+    from .schema_cache import load_schema_file
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(load_schema_file, path, **kwargs)
+    )
@@ -0,0 +1,197 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Validation backends build the validators used for every check. A validator
+# needs iter_errors(), is_valid() and validate() with jsonschema's semantics.
+
+import abc
+import functools
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .types import SchemaType
+from .validator_cache import get_canonical_json, get_fingerprint
+
+JSONSCHEMA = "jsonschema"
+FASTJSONSCHEMA = "fastjsonschema"
+
+
+class ValidationBackend(abc.ABC):
+    name: str
+
+    @abc.abstractmethod
+    def create_validator(self, schema: SchemaType, ref_resolver: Any = None) -> Any:
+        pass
+
+
+class JsonschemaBackend(ValidationBackend):
+    name = JSONSCHEMA
+
+    def create_validator(self, schema: SchemaType, ref_resolver: Any = None) -> Any:
+        import jsonschema
+
+        return jsonschema.Draft7Validator(
+            schema,
+            format_checker=jsonschema.draft7_format_checker,
+            resolver=ref_resolver,
+        )
+
+
+JSONSCHEMA_BACKEND = JsonschemaBackend()
+
+
+class CompiledValidator:
+    # answers valid/invalid with the generated function, and only builds a
+    # jsonschema validator to explain a failure
+    def __init__(self, schema: SchemaType, func: Callable, exception_class: type):
+        self.schema = schema
+        self._func = func
+        self._exception_class = exception_class
+        self._fallback = None
+
+    def _get_fallback(self):
+        if self._fallback is None:
+            self._fallback = JSONSCHEMA_BACKEND.create_validator(self.schema)
+        return self._fallback
+
+    def is_valid(self, instance: Any) -> bool:
+        try:
+            self._func(instance)
+        except self._exception_class:
+            return False
+        return True
+
+    def iter_errors(self, instance: Any):
+        if self.is_valid(instance):
+            return iter(())
+        return self._get_fallback().iter_errors(instance)
+
+    def validate(self, instance: Any) -> None:
+        if not self.is_valid(instance):
+            self._get_fallback().validate(instance)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_format_checkers() -> Dict[str, Callable[[Any], bool]]:
+    # formats are checked by jsonschema's draft 7 format checker, as with the
+    # jsonschema backend, rather than fastjsonschema's own regexes, which check
+    # different formats (and some, like date-time, only when jsonschema has the
+    # optional package it needs); a format neither knows about isn't checked
+    import jsonschema
+    from fastjsonschema.draft07 import CodeGeneratorDraft07
+
+    format_checker = jsonschema.draft7_format_checker
+    names = set(format_checker.checkers) | set(CodeGeneratorDraft07.FORMAT_REGEXS)
+    names.add("regex")
+    return {
+        name: functools.partial(format_checker.conforms, format=name)
+        for name in sorted(names)
+    }
+
+
+class FastjsonschemaBackend(ValidationBackend):
+    name = FASTJSONSCHEMA
+
+    def __init__(self, cache_dir: Optional[str] = None, use_cache: bool = True) -> None:
+        import fastjsonschema
+
+        self._fastjsonschema = fastjsonschema
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self._lock = threading.Lock()
+        self._functions: Dict[str, Callable] = {}
+        self._format_checkers = _get_format_checkers()
+
+    def _get_source_dir(self) -> str:
+        from .schema_cache import get_cache_dir
+
+        version = self._fastjsonschema.VERSION
+        return os.path.join(
+            self.cache_dir or get_cache_dir(), "validators", f"fastjsonschema-{version}"
+        )
+
+    def _generate_source(self, schema: SchemaType) -> str:
+        # defaults must not be filled in: validated values are the user's answers
+        return self._fastjsonschema.compile_to_code(
+            schema,
+            formats=self._format_checkers,
+            use_default=False,
+            detailed_exceptions=False,
+        )
+
+    def _get_source(self, schema: SchemaType, fingerprint: str) -> str:
+        if not self.use_cache:
+            return self._generate_source(schema)
+        from .schema_cache import read_signed_file, write_signed_file
+
+        # the source is executed, so it's only read back if it was signed here
+        source_dir = self._get_source_dir()
+        source_path = os.path.join(source_dir, fingerprint + ".py")
+        source = read_signed_file(source_path)
+        if source is not None:
+            return source.decode("utf-8")
+        source = self._generate_source(schema)
+        write_signed_file(source_dir, source_path, source.encode("utf-8"))
+        return source
+
+    def _get_function(self, schema: SchemaType, canonical_json: str) -> Callable:
+        # generated code differs with the formats that can be checked
+        fingerprint = get_fingerprint(
+            canonical_json + "\n" + ",".join(self._format_checkers)
+        )
+        with self._lock:
+            func = self._functions.get(fingerprint)
+        if func is None:
+            namespace = {}
+            source = self._get_source(schema, fingerprint)
+            exec(compile(source, f"<validator {fingerprint}>", "exec"), namespace)
+            func = functools.partial(
+                namespace["validate"], custom_formats=self._format_checkers
+            )
+            with self._lock:
+                self._functions[fingerprint] = func
+        return func
+
+    def create_validator(self, schema: SchemaType, ref_resolver: Any = None) -> Any:
+        canonical_json = get_canonical_json(schema)
+        if ref_resolver is not None and '"$ref"' in canonical_json:
+            # generated code can't follow a $ref out of the subschema it was
+            # compiled from, so those go to jsonschema
+            return JSONSCHEMA_BACKEND.create_validator(schema, ref_resolver)
+        try:
+            func = self._get_function(schema, canonical_json)
+        except self._fastjsonschema.JsonSchemaDefinitionException:
+            return JSONSCHEMA_BACKEND.create_validator(schema)
+        return CompiledValidator(
+            schema, func, self._fastjsonschema.JsonSchemaValueException
+        )
+
+
+BACKENDS = [JSONSCHEMA, FASTJSONSCHEMA]
+
+
+def get_backend(name: str, **kwargs) -> ValidationBackend:
+    # kwargs configure backends that have options, and are ignored by the others
+    if name == JSONSCHEMA:
+        return JSONSCHEMA_BACKEND
+    if name == FASTJSONSCHEMA:
+        try:
+            return FastjsonschemaBackend(**kwargs)
+        except ModuleNotFoundError:
+            raise ValueError(
+                "The fastjsonschema backend requires the fastjsonschema package "
+                "(pip install jsonschema-prompt[fast])"
+            )
+    raise ValueError(f"Unknown validation backend {name!r}, must be one of: {', '.join(BACKENDS)}")
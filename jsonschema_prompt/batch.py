@@ -0,0 +1,157 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+import json
+import multiprocessing
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Union
+
+from . import prompt, compile
+from jsonpointer import JsonPointer
+
+from .types import SchemaType
+from .input import HEADLESS_INPUT_HANDLER
+from .context import Context
+from .plan import CompiledSchema
+from .backends import get_backend, JSONSCHEMA
+from .exceptions import SetValueError, PromptValidationError, MissingAnswerError
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchResult:
+    index: int
+    value: Any = None
+    error: Optional[str] = None
+
+
+def _is_pointer_mapping(answers: Mapping) -> bool:
+    return bool(answers) and all(
+        isinstance(key, str) and (key == "" or key.startswith("/")) for key in answers
+    )
+
+
+def _flatten_document(document: Any, path: str, values: Dict[str, Any]) -> None:
+    if isinstance(document, dict) and document:
+        for key, value in document.items():
+            escaped = key.replace("~", "~0").replace("/", "~1")
+            _flatten_document(value, f"{path}/{escaped}", values)
+    else:
+        values[path] = document
+
+
+def get_answer_values(answers: Any) -> Dict[str, Any]:
+    if isinstance(answers, dict):
+        if _is_pointer_mapping(answers):
+            return dict(answers)
+        values = {}
+        for key, value in answers.items():
+            escaped = key.replace("~", "~0").replace("/", "~1")
+            _flatten_document(value, f"/{escaped}", values)
+        return values
+    # a scalar or array answers the whole document
+    return {"": answers}
+
+
+_worker_state = {}
+
+
+def _init_worker(
+    schema: Union[SchemaType, CompiledSchema],
+    set_values: Mapping,
+    validation_backend: str = JSONSCHEMA,
+    accept_defaults: bool = False,
+    shallow_validation: bool = False,
+) -> None:
+    if not isinstance(schema, CompiledSchema):
+        schema = compile(schema)
+    _worker_state["schema"] = schema
+    _worker_state["set_values"] = set_values
+    # backends hold compiled code, so each worker builds its own
+    _worker_state["validation_backend"] = get_backend(validation_backend)
+    _worker_state["accept_defaults"] = accept_defaults
+    _worker_state["shallow_validation"] = shallow_validation
+
+
+def _fill_document(item) -> BatchResult:
+    index, answers = item
+    values = dict(_worker_state["set_values"])
+    try:
+        values.update(get_answer_values(answers))
+        compiled_schema = _worker_state["schema"]
+        validation_backend = _worker_state["validation_backend"]
+        value = prompt(
+            compiled_schema,
+            set_values=values,
+            input_handler=HEADLESS_INPUT_HANDLER,
+            validation_backend=validation_backend,
+            accept_defaults=_worker_state["accept_defaults"],
+            shallow_validation=_worker_state["shallow_validation"],
+        )
+        # set values outside the schema's properties are merged in after prompting
+        validator = Context(
+            HEADLESS_INPUT_HANDLER, validation_backend=validation_backend
+        ).get_validator(compiled_schema.schema)
+        errors = [e.message for e in validator.iter_errors(value)]
+        if errors:
+            raise PromptValidationError(JsonPointer(""), value, errors)
+    except (SetValueError, PromptValidationError, MissingAnswerError) as e:
+        return BatchResult(index=index, error=str(e))
+    except EOFError:
+        return BatchResult(index=index, error="Missing answers")
+    return BatchResult(index=index, value=value)
+
+
+def fill_documents(
+    schema: Union[SchemaType, CompiledSchema],
+    answers: Iterable[Any],
+    *,
+    set_values: Optional[Mapping] = None,
+    processes: Optional[int] = None,
+    chunksize: int = 16,
+    validation_backend: str = JSONSCHEMA,
+    accept_defaults: bool = False,
+    shallow_validation: bool = False,
+) -> Iterator[BatchResult]:
+    set_values = dict(set_values or {})
+    items = enumerate(answers)
+    if processes == 1:
+        _init_worker(
+            schema, set_values, validation_backend, accept_defaults, shallow_validation
+        )
+        yield from map(_fill_document, items)
+        return
+    with multiprocessing.Pool(
+        processes,
+        initializer=_init_worker,
+        initargs=(
+            schema,
+            set_values,
+            validation_backend,
+            accept_defaults,
+            shallow_validation,
+        ),
+    ) as pool:
+        # imap keeps results in input order while workers run ahead
+        yield from pool.imap(_fill_document, items, chunksize=chunksize)
+
+
+def read_answers(lines: Iterable[str]) -> Iterator[Any]:
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number} of answers: {e}")
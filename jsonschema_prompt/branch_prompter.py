@@ -0,0 +1,279 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A oneOf/anyOf schema is prompted as one of its branches, merged with the
+# keywords around it. The branch is picked by the value of a discriminator, a
+# property that every branch fixes with const or enum to values no other branch
+# uses; otherwise by type, if every branch has a different one; otherwise by
+# choosing from the branches' titles. A oneOf value is checked against the
+# whole schema once it is complete (see prompter.py), as it may match more than
+# the branch selected.
+
+import dataclasses
+import itertools
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from .types import SchemaType
+from .context import Context
+from .enum_index import _get_value_key
+from .exceptions import SetValueError
+from .prompter import prompt_from_schema, PromptText
+from .refs import resolve
+from .utils import find_types_in_schema
+
+
+@dataclasses.dataclass(frozen=True)
+class _BranchData:
+    keyword: str
+    # each branch merged with the schema around it
+    branch_schemas: Tuple[SchemaType, ...]
+    discriminator: Optional[str] = None
+    discriminator_schema: Optional[SchemaType] = None
+    # by discriminator value: the branch, with the discriminator fixed to the value
+    schemas_by_value: Mapping[Hashable, SchemaType] = dataclasses.field(
+        default_factory=dict
+    )
+    schemas_by_type: Mapping[str, SchemaType] = dataclasses.field(default_factory=dict)
+    labels: Tuple[str, ...] = ()
+
+    @property
+    def exclusive(self) -> bool:
+        # a value entered for one branch of a oneOf can match another as well,
+        # which the selected branch alone doesn't check
+        return self.keyword == "oneOf" and len(self.branch_schemas) > 1
+
+    def get_planned_schemas(self):
+        yield from self.branch_schemas
+        if self.discriminator_schema is not None:
+            yield self.discriminator_schema
+        yield from self.schemas_by_value.values()
+
+
+# keywords that don't constrain the value, which a branch simply overrides
+_ANNOTATION_KEYWORDS = frozenset(
+    ["title", "description", "default", "examples", "$comment"]
+)
+
+
+# additionalProperties applies to the names the properties and patterns beside
+# it don't cover, and additionalItems to the items beyond items, so a branch's
+# entries can't be merged into the outer schema's without loosening it
+_DEPENDENT_KEYWORDS = (
+    (
+        "additionalProperties",
+        ("properties", "patternProperties", "additionalProperties"),
+    ),
+    ("additionalItems", ("items", "additionalItems")),
+)
+
+
+def _merge_property_schemas(
+    outer_schema: SchemaType, property_schema: SchemaType
+) -> SchemaType:
+    if outer_schema is True:
+        return property_schema
+    if property_schema is True:
+        return outer_schema
+    if outer_schema is False or property_schema is False:
+        return False
+    return _merge_schemas(outer_schema, property_schema)
+
+
+def _merge_schemas(schema: SchemaType, branch: SchemaType) -> SchemaType:
+    # a keyword both set is kept from each: the branch's in place, so it
+    # decides what is prompted for, and the outer one under allOf
+    merged = dict(schema)
+    all_of = []
+    for dependent, keywords in _DEPENDENT_KEYWORDS:
+        constrained = any(
+            part.get(dependent, True) not in (True, {}) for part in (schema, branch)
+        )
+        if constrained and (
+            any(k in schema for k in keywords) and any(k in branch for k in keywords)
+        ):
+            # the outer entries are checked together, and the branch's prompted
+            all_of.append({k: merged.pop(k) for k in keywords if k in merged})
+    for key, value in branch.items():
+        if key not in merged or key in _ANNOTATION_KEYWORDS:
+            merged[key] = value
+        elif key == "properties":
+            properties = dict(merged["properties"])
+            for name, property_schema in value.items():
+                if name in properties:
+                    property_schema = _merge_property_schemas(
+                        properties[name], property_schema
+                    )
+                properties[name] = property_schema
+            merged["properties"] = properties
+        elif key == "required":
+            required = itertools.chain(merged["required"], value)
+            merged["required"] = list(dict.fromkeys(required))
+        elif key == "allOf":
+            all_of.extend(value)
+        elif merged[key] != value:
+            all_of.append({key: merged[key]})
+            merged[key] = value
+    if all_of:
+        merged["allOf"] = [*merged.get("allOf", []), *all_of]
+    return merged
+
+
+def _merge_branch(schema: SchemaType, keyword: str, branch: SchemaType) -> SchemaType:
+    return _merge_schemas({k: v for k, v in schema.items() if k != keyword}, branch)
+
+
+def _get_fixed_values(schema: Any) -> Optional[List[Any]]:
+    if not isinstance(schema, dict):
+        return None
+    if "const" in schema:
+        return [schema["const"]]
+    if schema.get("enum"):
+        return list(schema["enum"])
+    return None
+
+
+def _get_discriminator_table(
+    fixed_values: List[Dict[str, List[Any]]], name: str
+) -> Optional[Dict[Hashable, Tuple[int, Any]]]:
+    # value key -> (branch index, value), if no two branches share a value
+    table = {}
+    for index, branch_values in enumerate(fixed_values):
+        if name not in branch_values:
+            return None
+        for value in branch_values[name]:
+            key = _get_value_key(value)
+            if key in table:
+                return None
+            table[key] = (index, value)
+    return table
+
+
+def _find_discriminator(
+    branches: List[SchemaType], resolver
+) -> Tuple[Optional[str], Dict[Hashable, Tuple[int, Any]]]:
+    fixed_values = []
+    for branch in branches:
+        branch_values = {}
+        for name, property_schema in branch.get("properties", {}).items():
+            values = _get_fixed_values(resolve(property_schema, resolver))
+            if values is not None:
+                branch_values[name] = values
+        fixed_values.append(branch_values)
+    for name in fixed_values[0]:
+        table = _get_discriminator_table(fixed_values, name)
+        if table is not None:
+            return name, table
+    return None, {}
+
+
+def _get_labels(branches: List[SchemaType]) -> Tuple[str, ...]:
+    labels = []
+    for index, branch in enumerate(branches, start=1):
+        label = branch.get("title") or str(index)
+        if label in labels:
+            label = f"{label} ({index})"
+        labels.append(label)
+    return tuple(labels)
+
+
+def _get_branch_data(schema: SchemaType, resolver=None) -> Optional[_BranchData]:
+    keyword = "oneOf" if "oneOf" in schema else "anyOf"
+    branches = [resolve(branch, resolver) for branch in schema[keyword]]
+    if not branches or not all(isinstance(branch, dict) for branch in branches):
+        return None
+    branch_schemas = tuple(
+        _merge_branch(schema, keyword, branch) for branch in branches
+    )
+
+    discriminator, table = _find_discriminator(branches, resolver)
+    if discriminator is not None:
+        values = [value for _, value in table.values()]
+        discriminator_schema = {"enum": values}
+        if all(isinstance(value, str) for value in values):
+            discriminator_schema["type"] = "string"
+        schemas_by_value = {}
+        for key, (index, value) in table.items():
+            branch_schema = branch_schemas[index]
+            properties = dict(branch_schema.get("properties", {}))
+            properties[discriminator] = {"const": value}
+            schemas_by_value[key] = dict(branch_schema, properties=properties)
+        return _BranchData(
+            keyword=keyword,
+            branch_schemas=branch_schemas,
+            discriminator=discriminator,
+            discriminator_schema=discriminator_schema,
+            schemas_by_value=schemas_by_value,
+        )
+
+    branch_types = [find_types_in_schema(branch, resolver) for branch in branch_schemas]
+    if all(len(types) == 1 for types in branch_types) and len(
+        {types[0] for types in branch_types}
+    ) == len(branch_types):
+        return _BranchData(
+            keyword=keyword,
+            branch_schemas=branch_schemas,
+            schemas_by_type={
+                types[0]: branch_schema
+                for types, branch_schema in zip(branch_types, branch_schemas)
+            },
+        )
+
+    return _BranchData(
+        keyword=keyword, branch_schemas=branch_schemas, labels=_get_labels(branches)
+    )
+
+
+def _get_discriminator_value(data: _BranchData, *, context: Context) -> Any:
+    value_node = context.get_child_value_node(data.discriminator)
+    if value_node is not None:
+        value = value_node.value
+        if _get_value_key(value) not in data.schemas_by_value:
+            from jsonpointer import JsonPointer
+
+            raise SetValueError(
+                JsonPointer(value_node.path),
+                value,
+                f"{value!r} is not one of {data.discriminator_schema['enum']!r}",
+            )
+        return value
+    prompt_text = PromptText(
+        fixed_type=f"{data.discriminator} [$type] [REQUIRED]: ",
+        selected_type=f"{data.discriminator} [REQUIRED]: ",
+    )
+    return prompt_from_schema(
+        prompt_text,
+        data.discriminator_schema,
+        context=context.subcontext(data.discriminator),
+    )
+
+
+def select_branch(
+    prompt_text: str, data: _BranchData, *, context: Context
+) -> SchemaType:
+    if len(data.branch_schemas) == 1:
+        return data.branch_schemas[0]
+    if data.discriminator is not None:
+        value = _get_discriminator_value(data, context=context)
+        return data.schemas_by_value[_get_value_key(value)]
+    if data.schemas_by_type:
+        types = list(data.schemas_by_type)
+        type_prompter = context.get_type_prompter()
+        type = type_prompter(
+            PromptText.get_type_prompt_text(prompt_text), types, context=context
+        )
+        return data.schemas_by_type[type]
+    label = context.get_prompter("enum")(
+        "Choose a schema: ", {"enum": list(data.labels)}, context=context
+    )
+    return data.branch_schemas[data.labels.index(label)]
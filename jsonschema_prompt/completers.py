@@ -0,0 +1,28 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from prompt_toolkit.completion import Completer, Completion
+
+from .enum_index import EnumIndex
+
+
+class EnumCompleter(Completer):
+    def __init__(self, index: EnumIndex, *, limit: int = 100):
+        self.index = index
+        self.limit = limit
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        for match in self.index.complete(text, self.limit):
+            yield Completion(match, start_position=-len(text))
@@ -12,57 +12,340 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import dataclasses
-import itertools
-from typing import Callable, Mapping, Union, Any
-
-import jsonschema
+import time
+from typing import Callable, Iterable, List, Mapping, Union, Any, Optional, Tuple, TYPE_CHECKING
 
 from .input import InputHandler
-from jsonpointer import JsonPointer
+from .validator_cache import ValidatorCache, DEFAULT_VALIDATOR_CACHE
+from .set_values import SetValueNode, build_set_values_trie
+from .refs import SchemaResolver
+from .backends import ValidationBackend, JSONSCHEMA_BACKEND
+from .events import (
+    Event,
+    EventHook,
+    get_path_pattern,
+    hook_input_handler,
+    NODE_ENTER,
+    NODE_EXIT,
+    VALIDATOR_COMPILE,
+    VALIDATION_RUN,
+    VALIDATION_FAILED,
+)
+
+if TYPE_CHECKING:
+    from jsonpointer import JsonPointer
+    from .plan import CompiledSchema, SchemaPlan
+    from .sinks import OutputSink
 
 
-def _validator_factory(schema):
-    return jsonschema.Draft7Validator(
-        schema, format_checker=jsonschema.draft7_format_checker
+class _SessionState:
+    __slots__ = (
+        "values",
+        "validator_cache",
+        "compiled_schema",
+        "resolver",
+        "input_handlers",
+        "base_input_handler",
+        "hooks",
+        "nodes",
+        "sink",
+        "items_streamed",
+        "validation_backend",
+        "accept_defaults",
+        "static_values",
+        "shallow_validation",
+        "full_validation",
     )
 
+    def __init__(
+        self,
+        *,
+        input_handler,
+        values,
+        validator_cache,
+        compiled_schema,
+        resolver,
+        sink=None,
+        validation_backend=JSONSCHEMA_BACKEND,
+        accept_defaults=False,
+        shallow_validation=False,
+        full_validation=False,
+    ):
+        self.values = values
+        self.validator_cache = validator_cache
+        self.compiled_schema = compiled_schema
+        self.resolver = resolver
+        self.base_input_handler = input_handler
+        # indented input handlers, shared by every context at the same indent level
+        self.input_handlers = [input_handler]
+        self.hooks: List[EventHook] = []
+        # (path, path_pattern) of the nodes being prompted for, innermost last
+        self.nodes = []
+        self.sink = sink
+        self.items_streamed = False
+        self.validation_backend = validation_backend
+        self.accept_defaults = accept_defaults
+        # for schemas that weren't compiled, found as they're prompted for
+        self.static_values = None
+        self.shallow_validation = shallow_validation
+        self.full_validation = full_validation
+
+    def add_hook(self, hook: EventHook) -> None:
+        if not self.hooks:
+            self.input_handlers = [
+                hook_input_handler(self.base_input_handler, self.emit_at_current_node)
+            ]
+        self.hooks.append(hook)
+
+    def emit(self, event: Event) -> None:
+        for hook in self.hooks:
+            hook(event)
+
+    def emit_at_current_node(self, type, *, duration_ns=None, **data):
+        path, path_pattern = self.nodes[-1] if self.nodes else ("", "")
+        self.emit(
+            Event(type, path, path_pattern, time.perf_counter_ns(), duration_ns, data)
+        )
+
+    def get_input_handler(self, indent: int) -> InputHandler:
+        input_handlers = self.input_handlers
+        while len(input_handlers) <= indent:
+            input_handlers.append(input_handlers[-1].with_indent())
+        return input_handlers[indent]
+
 
-@dataclasses.dataclass(frozen=True)
 class Context:
-    input_handler: InputHandler
-    values: Mapping[JsonPointer, Any] = None
-    path: JsonPointer = JsonPointer("")
-
-    def __post_init__(self):
-        values = {}
-        if self.values:
-            for key, value in self.values.items():
-                if not isinstance(key, JsonPointer):
-                    key = JsonPointer(key)
-                values[key] = value
-        object.__setattr__(self, "values", values)
+    __slots__ = (
+        "_session",
+        "_parent",
+        "_element",
+        "_indent",
+        "_path",
+        "_path_pattern",
+        "_values_node",
+    )
 
-    def subcontext(self, element: Union[str, int], *, indent: bool = True) -> "Context":
-        new_parts = self.path.get_parts() + [element]
-        subcontext = dataclasses.replace(self, path=JsonPointer.from_parts(new_parts))
-        if indent:
-            subcontext = dataclasses.replace(
-                subcontext, input_handler=self.input_handler.with_indent()
+    def __init__(
+        self,
+        input_handler: InputHandler,
+        values: Union[Mapping["JsonPointer", Any], SetValueNode] = None,
+        path: "JsonPointer" = None,
+        validator_cache: Optional[ValidatorCache] = DEFAULT_VALIDATOR_CACHE,
+        compiled_schema: Optional["CompiledSchema"] = None,
+        resolver: Optional[SchemaResolver] = None,
+        hooks: Iterable[EventHook] = (),
+        sink: Optional["OutputSink"] = None,
+        validation_backend: Optional[ValidationBackend] = None,
+        accept_defaults: bool = False,
+        shallow_validation: bool = False,
+        full_validation: bool = False,
+    ) -> None:
+        if not isinstance(values, SetValueNode):
+            values = build_set_values_trie(values)
+        self._session = _SessionState(
+            input_handler=input_handler,
+            values=values,
+            validator_cache=validator_cache,
+            compiled_schema=compiled_schema,
+            resolver=resolver,
+            sink=sink,
+            validation_backend=validation_backend or JSONSCHEMA_BACKEND,
+            accept_defaults=accept_defaults,
+            shallow_validation=shallow_validation,
+            full_validation=full_validation,
+        )
+        self._parent = None
+        self._element = None
+        self._indent = 0
+        self._path = path
+        self._path_pattern = None
+        for hook in hooks:
+            self._session.add_hook(hook)
+        values_node = values.get_descendant(path.parts) if path is not None else values
+        self._values_node = values_node if values_node else None
+
+    @classmethod
+    def _create_child(
+        cls, parent: "Context", element: Union[str, int, None], indent: int
+    ) -> "Context":
+        context = cls.__new__(cls)
+        context._session = parent._session
+        context._parent = parent
+        context._element = element
+        context._indent = indent
+        context._path = None
+        context._path_pattern = None
+        if element is None or parent._values_node is None:
+            context._values_node = parent._values_node
+        else:
+            context._values_node = parent._values_node.get_child(element)
+        return context
+
+    @property
+    def input_handler(self) -> InputHandler:
+        return self._session.get_input_handler(self._indent)
+
+    @property
+    def child_input_handler(self) -> InputHandler:
+        return self._session.get_input_handler(self._indent + 1)
+
+    @property
+    def values(self) -> SetValueNode:
+        return self._session.values
+
+    @property
+    def validator_cache(self) -> Optional[ValidatorCache]:
+        return self._session.validator_cache
+
+    @property
+    def compiled_schema(self) -> Optional["CompiledSchema"]:
+        return self._session.compiled_schema
+
+    @property
+    def validation_backend(self) -> ValidationBackend:
+        return self._session.validation_backend
+
+    @property
+    def resolver(self) -> Optional[SchemaResolver]:
+        return self._session.resolver
+
+    @property
+    def accept_defaults(self) -> bool:
+        return self._session.accept_defaults
+
+    @property
+    def path(self) -> "JsonPointer":
+        if self._path is None:
+            from jsonpointer import JsonPointer
+
+            if self._parent is None:
+                self._path = JsonPointer("")
+            elif self._element is None:
+                self._path = self._parent.path
+            else:
+                parent_path = self._parent.path.path
+                escaped = str(self._element).replace("~", "~0").replace("/", "~1")
+                self._path = JsonPointer(f"{parent_path}/{escaped}")
+        return self._path
+
+    @property
+    def path_pattern(self) -> str:
+        # the path with array indexes replaced by "*", for aggregating across items
+        if self._path_pattern is None:
+            if self._parent is None:
+                self._path_pattern = get_path_pattern(self.path.path)
+            elif self._element is None:
+                self._path_pattern = self._parent.path_pattern
+            elif isinstance(self._element, int):
+                self._path_pattern = self._parent.path_pattern + "/*"
+            else:
+                escaped = str(self._element).replace("~", "~0").replace("/", "~1")
+                self._path_pattern = f"{self._parent.path_pattern}/{escaped}"
+        return self._path_pattern
+
+    @property
+    def hooks(self) -> List[EventHook]:
+        return self._session.hooks
+
+    def add_hook(self, hook: EventHook) -> None:
+        self._session.add_hook(hook)
+
+    def emit(
+        self,
+        type: str,
+        *,
+        duration_ns: Optional[int] = None,
+        value: Any = None,
+        **data,
+    ) -> None:
+        if self._session.hooks:
+            self._session.emit(
+                Event(
+                    type,
+                    self.path.path,
+                    self.path_pattern,
+                    time.perf_counter_ns(),
+                    duration_ns,
+                    data,
+                    value,
+                )
+            )
+
+    def call_node(self, func: Callable, *args, **kwargs) -> Any:
+        session = self._session
+        self.emit(NODE_ENTER)
+        session.nodes.append((self.path.path, self.path_pattern))
+        start = time.perf_counter_ns()
+        status = "error"
+        value = None
+        try:
+            value = func(*args, **kwargs)
+            status = "ok"
+            return value
+        except EOFError:
+            status = "eof"
+            raise
+        finally:
+            session.nodes.pop()
+            data = {"status": status}
+            if self._parent is None and session.items_streamed:
+                data["streamed"] = True
+            self.emit(
+                NODE_EXIT,
+                duration_ns=time.perf_counter_ns() - start,
+                value=value,
+                **data,
             )
-        return subcontext
+
+    def subcontext(self, element: Union[str, int], *, indent: bool = True) -> "Context":
+        return self._create_child(
+            self, element, self._indent + 1 if indent else self._indent
+        )
 
     def with_indent(self) -> "Context":
-        return dataclasses.replace(self, input_handler=self.input_handler.with_indent())
+        return self._create_child(self, None, self._indent + 1)
+
+    def without_item_sink(self) -> "Context":
+        # the same node, whose items are kept rather than streamed to the sink
+        return self._create_child(self, None, self._indent)
 
     def get_path_str(self) -> str:
         return repr(self.path.path)
 
     def has_value(self) -> bool:
-        return self.path in self.values
+        return self._values_node is not None and self._values_node.has_value
 
     def get_value(self) -> Any:
-        return self.values[self.path]
+        return self._values_node.value
+
+    def get_value_node(self) -> Optional[SetValueNode]:
+        return self._values_node
+
+    def get_child_value_node(self, element: Union[str, int]) -> Optional[SetValueNode]:
+        if self._values_node is None:
+            return None
+        child = self._values_node.get_child(element)
+        if child is not None and child.has_value:
+            return child
+        return None
+
+    def has_child_values(self, element: Union[str, int]) -> bool:
+        if self._values_node is None:
+            return False
+        return self._values_node.get_child(element) is not None
+
+    def get_item_sink(self) -> Optional["OutputSink"]:
+        # only the items of the root array are streamed
+        if self._parent is None:
+            return self._session.sink
+        return None
+
+    @property
+    def items_streamed(self) -> bool:
+        return self._session.items_streamed
+
+    def set_items_streamed(self) -> None:
+        self._session.items_streamed = True
 
     def get_prompter(self, type: str) -> Callable:
         from . import scalar_prompters, array_prompter, object_prompter
@@ -70,6 +353,7 @@ class Context:
         PROMPT_FUNCS = {
             "array": array_prompter.prompt_array,
             "boolean": scalar_prompters.prompt_boolean,
+            "enum": scalar_prompters.prompt_enum,
             "integer": scalar_prompters.prompt_number,
             "null": scalar_prompters.prompt_null,
             "number": scalar_prompters.prompt_number,
@@ -78,18 +362,111 @@ class Context:
         }
         return PROMPT_FUNCS[type]
 
+    def resolve(self, schema):
+        resolver = self._session.resolver
+        if resolver is None:
+            return schema
+        return resolver.resolve(schema)
+
+    def get_schema_plan(self, schema) -> "SchemaPlan":
+        if self.compiled_schema is not None:
+            schema_plan = self.compiled_schema.get_plan(schema)
+            if schema_plan is not None:
+                return schema_plan
+        from .plan import build_schema_plan
+
+        return build_schema_plan(schema, self._session.resolver)
+
+    def get_static_value(self, schema) -> Optional[Tuple[Any]]:
+        # (value,) if the schema's value needs no input, else None
+        session = self._session
+        schema = self.resolve(schema)
+        if session.compiled_schema is not None:
+            schema_plan = session.compiled_schema.get_plan(schema)
+            if schema_plan is not None:
+                if session.accept_defaults:
+                    return schema_plan.default_static_value
+                return schema_plan.static_value
+        if session.static_values is None:
+            from .plan import StaticValues
+
+            # uncompiled schemas are planned afresh for each value, so the
+            # schemas found here don't all live for the session
+            session.static_values = StaticValues(
+                session.resolver, session.accept_defaults, max_size=1024
+            )
+        return session.static_values.get(schema)
+
+    def get_branch_selector(self):
+        from . import branch_prompter
+
+        return branch_prompter.select_branch
+
     def get_type_prompter(self):
         from . import scalar_prompters
 
         return scalar_prompters.prompt_type
 
+    def _get_resolving_factory(self):
+        backend = self._session.validation_backend
+        resolver = self._session.resolver
+        if resolver is None or not resolver.has_refs:
+            return backend.create_validator, backend
+        # validators share the session's resolver, so each $ref is resolved once
+        ref_resolver = resolver.ref_resolver
+
+        def factory(schema):
+            return backend.create_validator(schema, ref_resolver)
+
+        return factory, (backend, resolver.key)
+
+    def _get_timed_factory(self):
+        factory, namespace = self._get_resolving_factory()
+        if not self._session.hooks:
+            return factory, namespace
+        # only called on validator cache misses; the namespace keeps the cache key
+        resolving_factory = factory
+
+        def factory(schema):
+            start = time.perf_counter_ns()
+            validator = resolving_factory(schema)
+            self.emit(VALIDATOR_COMPILE, duration_ns=time.perf_counter_ns() - start)
+            return validator
+
+        return factory, namespace
+
     def get_validator_factory(self):
-        return _validator_factory
+        factory, namespace = self._get_timed_factory()
+        if self.validator_cache is None:
+            return factory
+        return self.validator_cache.get_factory(factory, namespace=namespace)
 
     def get_validator(self, schema):
-        return jsonschema.Draft7Validator(
-            schema, format_checker=jsonschema.draft7_format_checker
-        )
+        factory, namespace = self._get_timed_factory()
+        if self.validator_cache is None:
+            return factory(schema)
+        return self.validator_cache.get(factory, schema, namespace=namespace)
+
+    def get_own_validator(self, schema, shallow_schema):
+        # with shallow_validation, each object and array checks only its own
+        # keywords, trusting the values beneath it, which were checked at their
+        # own level; full_validation then checks the whole document at the root
+        session = self._session
+        if not session.shallow_validation or (
+            self._parent is None and session.full_validation
+        ):
+            return self.get_validator(schema)
+        return self.get_validator(shallow_schema)
 
     def validate(self, schema, data):
         return self.get_validator(schema).validate(data)
+
+    def get_errors(self, validator, data) -> List[str]:
+        if not self._session.hooks:
+            return [e.message for e in validator.iter_errors(data)]
+        start = time.perf_counter_ns()
+        errors = [e.message for e in validator.iter_errors(data)]
+        self.emit(VALIDATION_RUN, duration_ns=time.perf_counter_ns() - start)
+        if errors:
+            self.emit(VALIDATION_FAILED, errors=errors)
+        return errors
@@ -0,0 +1,216 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import collections
+import json
+import threading
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+from .validator_cache import get_canonical_json, get_fingerprint
+
+MISSING = object()
+
+
+def get_value_text(value: Any) -> str:
+    # strings are entered as-is, everything else as JSON
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _get_value_key(value: Any) -> Hashable:
+    # equal in JSON schema terms: 1 and 1.0 are the same enum value
+    if isinstance(value, bool) or value is None:
+        return (type(value), value)
+    if isinstance(value, (int, float)):
+        return (float, float(value))
+    if isinstance(value, str):
+        return (str, value)
+    return (object, get_canonical_json(value))
+
+
+def _fuzzy_score(query: str, text: str) -> Optional[Tuple[int, int, int]]:
+    # the query's characters must appear in order; tighter and earlier matches
+    # score better (lower)
+    start = text.find(query[0])
+    if start < 0:
+        return None
+    position = start
+    for char in query[1:]:
+        position = text.find(char, position + 1)
+        if position < 0:
+            return None
+    return (position - start, start, len(text))
+
+
+class EnumIndex:
+    def __init__(self, values: Sequence[Any], examples: Sequence[Any] = ()) -> None:
+        self.values = list(values)
+        self._values_by_text: Dict[str, Any] = {}
+        self._values_by_key: Dict[Hashable, Any] = {}
+        for value in self.values:
+            self._values_by_text.setdefault(get_value_text(value), value)
+            self._values_by_key.setdefault(_get_value_key(value), value)
+
+        # examples that are allowed values are offered first
+        texts = []
+        seen = set()
+        for value in list(examples) + self.values:
+            text = get_value_text(value)
+            if text not in seen and (not self.values or text in self._values_by_text):
+                seen.add(text)
+                texts.append(text)
+        self.texts = texts
+        self._sorted: List[Tuple[str, int]] = sorted(
+            (text.lower(), order) for order, text in enumerate(texts)
+        )
+        self._lowered = [text.lower() for text in texts]
+        # character -> the texts containing it, built on the first fuzzy query
+        self._char_index: Optional[Dict[str, FrozenSet[int]]] = None
+        # the last query and the texts that matched it; the next keystroke's
+        # query usually extends it, and can only match a subset of them
+        self._last_fuzzy: Tuple[Optional[str], Tuple[int, ...]] = (None, ())
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def lookup(self, text: str) -> Any:
+        value = self._values_by_text.get(text, MISSING)
+        if value is not MISSING:
+            return value
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            return MISSING
+        return self._values_by_key.get(_get_value_key(parsed), MISSING)
+
+    def __contains__(self, text: str) -> bool:
+        return self.lookup(text) is not MISSING
+
+    def get_prefix_matches(self, prefix: str, limit: int) -> List[str]:
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._sorted, (prefix, -1))
+        matches = []
+        for lowered, order in self._sorted[start:]:
+            if not lowered.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(order)
+        return [self.texts[order] for order in sorted(matches)]
+
+    def _get_char_index(self) -> Dict[str, FrozenSet[int]]:
+        if self._char_index is None:
+            char_index = collections.defaultdict(list)
+            for order, lowered in enumerate(self._lowered):
+                for char in set(lowered):
+                    char_index[char].append(order)
+            self._char_index = {
+                char: frozenset(orders) for char, orders in char_index.items()
+            }
+        return self._char_index
+
+    def _get_fuzzy_candidates(self, query: str) -> Sequence[int]:
+        last_query, last_matches = self._last_fuzzy
+        if last_query is not None and query.startswith(last_query):
+            return last_matches
+        # a text matches only if it contains every character of the query
+        char_index = self._get_char_index()
+        postings = sorted(
+            (char_index.get(char, frozenset()) for char in set(query)), key=len
+        )
+        candidates = postings[0].intersection(*postings[1:])
+        return sorted(candidates)
+
+    def get_fuzzy_matches(self, query: str, limit: int) -> List[str]:
+        if not query:
+            return self.texts[:limit]
+        query = query.lower()
+        scored = []
+        for order in self._get_fuzzy_candidates(query):
+            score = _fuzzy_score(query, self._lowered[order])
+            if score is not None:
+                scored.append((score, order))
+        self._last_fuzzy = (query, tuple(order for _, order in scored))
+        scored.sort()
+        return [self.texts[order] for _, order in scored[:limit]]
+
+    def get_suggestions(self, text: str, limit: int = 3) -> List[str]:
+        # for a rejected value: subsequence matches, else the closest by edit ratio
+        suggestions = self.get_fuzzy_matches(text, limit) if text else []
+        if not suggestions and text:
+            import difflib
+
+            suggestions = difflib.get_close_matches(text, self.texts, n=limit)
+        return suggestions
+
+    def complete(self, text: str, limit: int = 100) -> List[str]:
+        if not text:
+            return self.texts[:limit]
+        matches = self.get_prefix_matches(text, limit)
+        if len(matches) < limit:
+            seen = set(matches)
+            for match in self.get_fuzzy_matches(text, limit):
+                if len(matches) >= limit:
+                    break
+                if match not in seen:
+                    matches.append(match)
+        return matches
+
+
+class EnumIndexCache:
+    # indexes by the fingerprint of their values and examples, least recently
+    # used first
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self._entries: "collections.OrderedDict[str, EnumIndex]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, values: Sequence[Any], examples: Sequence[Any] = ()) -> EnumIndex:
+        key = get_fingerprint(get_canonical_json([list(values), list(examples)]))
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+        index = EnumIndex(values, examples)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return index
+
+
+_ENUM_INDEX_CACHE = EnumIndexCache()
+# the same enum list is usually prompted for repeatedly; skip re-fingerprinting it
+_indexes_by_id: Dict[Tuple[int, int], Tuple[Any, Any, EnumIndex]] = {}
+_lock = threading.Lock()
+
+
+def get_enum_index(values: Sequence[Any], examples: Sequence[Any] = ()) -> EnumIndex:
+    id_key = (id(values), id(examples))
+    with _lock:
+        entry = _indexes_by_id.get(id_key)
+    if entry is not None and entry[0] is values and entry[1] is examples:
+        return entry[2]
+    index = _ENUM_INDEX_CACHE.get(values, examples)
+    with _lock:
+        if len(_indexes_by_id) >= 1024:
+            _indexes_by_id.clear()
+        _indexes_by_id[id_key] = (values, examples, index)
+    return index
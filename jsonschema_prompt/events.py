@@ -0,0 +1,89 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .input import InputHandler
+
+NODE_ENTER = "node_enter"
+NODE_EXIT = "node_exit"
+PROMPT_SHOWN = "prompt_shown"
+ANSWER_RECEIVED = "answer_received"
+RENDER = "render"
+VALIDATOR_COMPILE = "validator_compile"
+VALIDATION_RUN = "validation_run"
+VALIDATION_FAILED = "validation_failed"
+RESET = "reset"
+# a value entered other than through its own prompt, e.g. a bulk-imported item
+VALUE_IMPORTED = "value_imported"
+
+
+@dataclasses.dataclass(frozen=True)
+class Event:
+    type: str
+    # the JSON pointer of the node, and the same pointer with array indexes as "*"
+    path: str
+    path_pattern: str
+    # time.perf_counter_ns() when the event was emitted; events that cover a span
+    # (answers, rendering, validation, node exit) end at the timestamp
+    timestamp_ns: int
+    duration_ns: Optional[int] = None
+    data: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    # the value a node produced, on NODE_EXIT
+    value: Any = None
+
+
+EventHook = Callable[[Event], Any]
+
+
+def get_path_pattern(path: str) -> str:
+    return "/".join("*" if part.isdigit() else part for part in path.split("/"))
+
+
+def _timed(emit: Callable, kind: str, handler: Callable) -> Callable:
+    def timed_handler(**kwargs):
+        message = kwargs.get("message")
+        emit(PROMPT_SHOWN, kind=kind, message=str(message))
+        start = time.perf_counter_ns()
+        try:
+            answer = handler(**kwargs)
+        except EOFError:
+            emit(
+                ANSWER_RECEIVED,
+                duration_ns=time.perf_counter_ns() - start,
+                kind=kind,
+                eof=True,
+            )
+            raise
+        emit(ANSWER_RECEIVED, duration_ns=time.perf_counter_ns() - start, kind=kind)
+        return answer
+
+    return timed_handler
+
+
+def hook_input_handler(input_handler: InputHandler, emit: Callable) -> InputHandler:
+    def print_handler(message):
+        start = time.perf_counter_ns()
+        result = input_handler.print_handler(message)
+        emit(RENDER, duration_ns=time.perf_counter_ns() - start)
+        return result
+
+    return dataclasses.replace(
+        input_handler,
+        str_handler=_timed(emit, "string", input_handler.str_handler),
+        bool_handler=_timed(emit, "boolean", input_handler.bool_handler),
+        print_handler=print_handler,
+    )
@@ -12,16 +12,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any
+from typing import Any, Sequence, TYPE_CHECKING
 
-from jsonpointer import JsonPointer
+if TYPE_CHECKING:
+    from jsonpointer import JsonPointer
 
 
 class SetValueError(Exception):
-    def __init__(self, path: JsonPointer, value: Any, message: str) -> None:
+    def __init__(self, path: "JsonPointer", value: Any, message: str) -> None:
         self.path = path
         self.value = value
         self.message = message
 
     def __str__(self) -> str:
         return f"Cannot set path {self.path.path!r} to value {self.value!r}: {self.message}"
+
+
+class PromptValidationError(Exception):
+    def __init__(self, path: "JsonPointer", value: Any, errors: Sequence[str]) -> None:
+        self.path = path
+        self.value = value
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return f"Invalid value at path {self.path.path!r}: " + "\n".join(self.errors)
+
+
+class MissingAnswerError(EOFError):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"No answer for prompt {self.message.strip()!r}"
+
+
+class ReplayError(Exception):
+    pass
@@ -12,19 +12,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from email.policy import default
 import dataclasses
-from typing import Callable, Any, Optional
+import sys
+from typing import Callable, Any, List, Optional, TYPE_CHECKING
 import textwrap
 
-import prompt_toolkit
-from prompt_toolkit.validation import Validator
+from .exceptions import MissingAnswerError
+
+if TYPE_CHECKING:
+    from prompt_toolkit.validation import Validator
 
 PromptContinuationType = Callable[[int, int, int], str]
 
 
 def colored_text(color, text):
-    return prompt_toolkit.formatted_text.FormattedText([(color, text)])
+    from prompt_toolkit.formatted_text import FormattedText
+
+    return FormattedText([(color, text)])
+
+
+def get_plain_text(message: Any) -> str:
+    if isinstance(message, str):
+        return message
+    if isinstance(message, list):
+        # prompt_toolkit FormattedText
+        return "".join(fragment[1] for fragment in message)
+    return str(message)
 
 
 @dataclasses.dataclass(frozen=True)
@@ -34,12 +47,19 @@ class InputHandler:
     print_handler: Callable[[str], Any]
     indent: int = 0
     indent_width: int = 2
+    interactive: bool = True
+    validate_while_typing: bool = False
+    bulk_items: bool = False
 
     def with_indent(self, amount=1) -> "InputHandler":
         return dataclasses.replace(self, indent=self.indent + amount)
 
     def get_indented_str(self, s: str) -> str:
+        if not self.indent:
+            return s
         indent_str = " " * self.indent * self.indent_width
+        if "\n" not in s:
+            return indent_str + s if s.strip() else s
         return textwrap.indent(s, indent_str)
 
     def print_instructions(self, instructions: str) -> str:
@@ -56,7 +76,7 @@ class InputHandler:
         self,
         message: str,
         *,
-        validator: Validator,
+        validator: "Validator",
         completer: Optional[Callable] = None,
         validate_while_typing: Optional[bool] = None,
         multiline: Optional[bool] = None,
@@ -86,7 +106,7 @@ class InputHandler:
         self,
         message: str,
         *,
-        validator: Validator,
+        validator: "Validator",
         validate_while_typing: Optional[bool] = None,
         default: Optional[Any] = None,
     ):
@@ -102,6 +122,10 @@ class InputHandler:
     def get_boolean(self, message: str):
         return self.bool_handler(message=self.get_indented_str(message))
 
+    def require_interactive(self, message: str) -> None:
+        if not self.interactive:
+            raise MissingAnswerError(self.get_indented_str(message))
+
     def print(self, message: Any, *, indent: bool, color: str = None):
         if indent:
             message = self.get_indented_str(str(message))
@@ -112,8 +136,175 @@ class InputHandler:
         return self.print_handler(message)
 
 
+# prompt_toolkit is only imported once something is actually prompted or printed
+def _prompt(**kwargs):
+    from prompt_toolkit.shortcuts import prompt
+
+    return prompt(**kwargs)
+
+
+def _confirm(**kwargs):
+    from prompt_toolkit.shortcuts import confirm
+
+    return confirm(**kwargs)
+
+
+def _print_formatted_text(*args, **kwargs):
+    from prompt_toolkit.shortcuts import print_formatted_text
+
+    return print_formatted_text(*args, **kwargs)
+
+
 DEFAULT_INPUT_HANDLER = InputHandler(
-    str_handler=prompt_toolkit.shortcuts.prompt,
-    bool_handler=prompt_toolkit.shortcuts.confirm,
-    print_handler=prompt_toolkit.shortcuts.print_formatted_text,
+    str_handler=_prompt,
+    bool_handler=_confirm,
+    print_handler=_print_formatted_text,
+)
+
+
+def _no_answer(message: str, **kwargs):
+    raise MissingAnswerError(str(message))
+
+
+def _discard(message: Any):
+    pass
+
+
+# answers come only from set values; anything that would prompt is treated as CTRL-D
+HEADLESS_INPUT_HANDLER = InputHandler(
+    str_handler=_no_answer,
+    bool_handler=_no_answer,
+    print_handler=_discard,
+    interactive=False,
+)
+
+
+class BufferedPrinter:
+    # holds printed messages and renders them in a single write just before the
+    # next prompt, rather than one terminal write per message
+    def __init__(self, print_handler: Callable[[Any], Any]) -> None:
+        self.print_handler = print_handler
+        self._messages: List[Any] = []
+
+    def print(self, message: Any) -> None:
+        self._messages.append(message)
+
+    def flush(self) -> None:
+        if not self._messages:
+            return
+        messages, self._messages = self._messages, []
+        if all(isinstance(message, str) for message in messages):
+            self.print_handler("\n".join(messages))
+            return
+        from prompt_toolkit.formatted_text import FormattedText, to_formatted_text
+
+        fragments = []
+        for message in messages:
+            if fragments:
+                fragments.append(("", "\n"))
+            fragments.extend(to_formatted_text(message))
+        self.print_handler(FormattedText(fragments))
+
+    def _flushing(self, handler: Callable) -> Callable:
+        def flushing_handler(**kwargs):
+            self.flush()
+            return handler(**kwargs)
+
+        return flushing_handler
+
+    def wrap(self, input_handler: InputHandler) -> InputHandler:
+        return dataclasses.replace(
+            input_handler,
+            str_handler=self._flushing(input_handler.str_handler),
+            bool_handler=self._flushing(input_handler.bool_handler),
+            print_handler=self.print,
+        )
+
+
+# for when stdin or stdout isn't a terminal: prompts and messages go to stderr
+# as plain text, answers are read a line at a time, and prompt_toolkit never
+# sets up the terminal
+def _write_stderr(text: str) -> None:
+    sys.stderr.write(text)
+    sys.stderr.flush()
+
+
+def _read_line() -> str:
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip("\n")
+
+
+def _read_lines(prompt_continuation: Optional[PromptContinuationType]) -> str:
+    # a multiline answer ends at a blank line or the end of input
+    lines = []
+    while True:
+        if lines and prompt_continuation:
+            _write_stderr(prompt_continuation(0, len(lines), 0))
+        try:
+            line = _read_line()
+        except EOFError:
+            if not lines:
+                raise
+            break
+        if not line:
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _stdio_prompt(
+    *,
+    message: Any,
+    validator: Optional["Validator"] = None,
+    multiline: bool = False,
+    prompt_continuation: Optional[PromptContinuationType] = None,
+    default: Optional[str] = None,
+    **kwargs,
+) -> str:
+    message = get_plain_text(message)
+    while True:
+        _write_stderr(message + (f"[{default}] " if default else ""))
+        text = _read_lines(prompt_continuation) if multiline else _read_line()
+        if not text and default:
+            text = default
+        if validator is None:
+            return text
+        from prompt_toolkit.document import Document
+        from prompt_toolkit.validation import ValidationError
+
+        try:
+            validator.validate(Document(text))
+        except ValidationError as e:
+            _write_stderr(e.message + "\n")
+            continue
+        return text
+
+
+def _stdio_confirm(*, message: Any, **kwargs) -> bool:
+    message = get_plain_text(message)
+    while True:
+        _write_stderr(message + " (y/n) ")
+        answer = _read_line().strip().lower()
+        if answer in ("y", "yes"):
+            return True
+        if answer in ("n", "no"):
+            return False
+
+
+def _stdio_print(message: Any) -> None:
+    _write_stderr(get_plain_text(message) + "\n")
+
+
+STDIO_INPUT_HANDLER = InputHandler(
+    str_handler=_stdio_prompt,
+    bool_handler=_stdio_confirm,
+    print_handler=_stdio_print,
 )
+
+
+def get_default_input_handler() -> InputHandler:
+    if sys.stdin.isatty() and sys.stdout.isatty():
+        return DEFAULT_INPUT_HANDLER
+    return STDIO_INPUT_HANDLER
@@ -0,0 +1,147 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# An append-only journal of the values entered in a session, one JSON record
+# per line: {"p": pointer, "v": value} when a node is completed, and
+# {"r": pointer} when an object or array is reset. Replaying it gives set values
+# that answer everything completed before the session stopped.
+
+import json
+import os
+import time
+from typing import Any, Dict, IO, Iterable
+
+from .events import Event, NODE_EXIT, RESET, VALUE_IMPORTED
+from .set_values import SetValueNode
+
+
+def _end_last_record(path: str) -> None:
+    # the record being written when the session stopped may be cut off, and
+    # the next record appended would run into it; a complete record missing
+    # only its newline is kept
+    try:
+        fp = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with fp:
+        end = fp.seek(0, os.SEEK_END)
+        start = end
+        while start > 0:
+            chunk_start = max(0, start - 4096)
+            fp.seek(chunk_start)
+            newline = fp.read(start - chunk_start).rfind(b"\n")
+            if newline != -1:
+                start = chunk_start + newline + 1
+                break
+            start = chunk_start
+        if start == end:
+            return
+        fp.seek(start)
+        try:
+            json.loads(fp.read())
+        except ValueError:
+            fp.truncate(start)
+        else:
+            fp.write(b"\n")
+
+
+class Journal:
+    def __init__(
+        self, fp: IO[str], *, fsync_interval: float = 1.0, fsync_records: int = 64
+    ) -> None:
+        self.fp = fp
+        self.fsync_interval = fsync_interval
+        self.fsync_records = fsync_records
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    @classmethod
+    def open(cls, path: str, *, append: bool = False, **kwargs) -> "Journal":
+        if append:
+            _end_last_record(path)
+        return cls(open(path, "a" if append else "w"), **kwargs)
+
+    def _append(self, record: dict) -> None:
+        # flushed per record so a crashed process loses nothing; fsync, which
+        # guards against losing the OS buffers too, is batched
+        self.fp.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.fp.flush()
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.fsync_records
+            or time.monotonic() - self._last_fsync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        if self._unsynced:
+            self.fp.flush()
+            os.fsync(self.fp.fileno())
+            self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def __call__(self, event: Event) -> None:
+        if event.type == NODE_EXIT and event.data.get("status") == "ok":
+            if event.data.get("streamed"):
+                # the root array's items were journaled as they were entered
+                return
+            self._append({"p": event.path, "v": event.value})
+        elif event.type == VALUE_IMPORTED:
+            self._append({"p": event.path, "v": event.value})
+        elif event.type == RESET:
+            self._append({"r": event.path})
+
+    def close(self) -> None:
+        self.sync()
+        self.fp.close()
+
+
+def _get_parts(pointer: str) -> list:
+    if not pointer:
+        return []
+    return [
+        part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")
+    ]
+
+
+def replay_journal(lines: Iterable[str]) -> Dict[str, Any]:
+    root = SetValueNode("")
+    lines = list(lines)
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if line_number == len(lines):
+                # the write in progress when the session stopped
+                break
+            raise ValueError(f"Invalid journal record on line {line_number}")
+        if "r" in record:
+            root.remove(_get_parts(record["r"]))
+        else:
+            parts = _get_parts(record["p"])
+            root.add(parts, record["v"])
+            # a completed node's value covers everything entered beneath it
+            root.get_descendant(parts).children.clear()
+    return {str(pointer.path): value for pointer, value in root.items()}
+
+
+def load_journal(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r") as fp:
+            return replay_journal(fp)
+    except FileNotFoundError:
+        return {}
@@ -14,36 +14,162 @@
 
 import itertools
 import dataclasses
-from typing import List, Optional, Dict, Any
+import re
+from typing import Tuple, Optional, Dict, Any, Iterable, Mapping, Pattern
 import textwrap
 
-import jsonschema
-
 from .types import SchemaType
 from .context import Context
-from .utils import ALL_JSON_TYPES
-from .prompter import prompt_from_types, prompt_from_schema, PromptText
+from .events import RESET
+from .exceptions import PromptValidationError
+from .utils import ALL_JSON_TYPES, get_shallow_schema
+from .prompter import (
+    prompt_from_types,
+    prompt_from_schema,
+    use_set_value,
+    get_static_value,
+    PromptText,
+)
 from .scalar_prompters import prompt_string
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class _ObjectSchemaData:
-    required_properties: List[str]
-    all_properties: List[str]
+    required_properties: Tuple[str, ...]
+    all_properties: Tuple[str, ...]
     additional_properties: Any
+    property_schemas: Mapping[str, SchemaType]
+    prompt_texts: Mapping[str, PromptText]
+    optional_properties: Tuple[str, ...] = ()
+    pattern_properties: Tuple[Tuple[Pattern, SchemaType], ...] = ()
+    # for entering the names of properties beyond those listed, or None if
+    # there can't be any
+    property_name_schema: Optional[SchemaType] = None
+    # the schema without the keywords for property values, which were checked
+    # as they were entered
+    shallow_schema: Optional[SchemaType] = None
 
+    def get_entered_property_schemas(self) -> Iterable[SchemaType]:
+        for _, property_schema in self.pattern_properties:
+            if property_schema is not False:
+                yield property_schema
+        if isinstance(self.additional_properties, dict):
+            yield self.additional_properties
 
-def _get_object_schema_data(schema: SchemaType) -> _ObjectSchemaData:
-    required_properties = schema.get("required", [])
-    all_properties = required_properties + [
-        p for p in schema.get("properties", {}) if p not in required_properties
+    def get_entered_property_schema(self, property_name: str) -> Optional[SchemaType]:
+        # None if the name isn't allowed, and {} if any value is
+        property_schema = self.property_schemas.get(property_name)
+        if property_schema is not None:
+            return property_schema
+        matches = [
+            property_schema
+            for pattern, property_schema in self.pattern_properties
+            if pattern.search(property_name)
+        ]
+        if False in matches:
+            return None
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            return {"allOf": matches}
+        if not self.additional_properties:
+            return None
+        if isinstance(self.additional_properties, dict):
+            return self.additional_properties
+        return {}
+
+
+def _get_property_prompt_text(property_name: str, required: bool) -> PromptText:
+    coda = " [REQUIRED]" if required else " (CTRL-D to skip)"
+    return PromptText(
+        fixed_type=f"{property_name} [$type]{coda}: ",
+        selected_type=f"{property_name}{coda}: ",
+    )
+
+
+def _get_property_name_schema(
+    schema: SchemaType, all_properties: Tuple[str, ...]
+) -> SchemaType:
+    property_names = schema.get("propertyNames", {})
+    if property_names is True:
+        property_names = {}
+    name_schema = {"type": "string", **property_names}
+    # offered as completions: the names allowed, then the listed properties,
+    # which may have been skipped
+    allowed_names = [
+        name for name in property_names.get("enum", ()) if isinstance(name, str)
     ]
+    examples = list(
+        dict.fromkeys(
+            itertools.chain(
+                allowed_names, property_names.get("examples", ()), all_properties
+            )
+        )
+    )
+    if examples:
+        name_schema["examples"] = examples
+    return name_schema
+
+
+def _get_property_schema(
+    property_name: str,
+    property_schema: SchemaType,
+    pattern_properties: Tuple[Tuple[Pattern, SchemaType], ...],
+) -> SchemaType:
+    # a listed property must also match the pattern schemas for its name
+    if property_schema is True:
+        property_schema = {}
+    matches = [
+        pattern_schema
+        for pattern, pattern_schema in pattern_properties
+        if pattern_schema != {} and pattern.search(property_name)
+    ]
+    if not matches or property_schema is False:
+        return property_schema
+    if False in matches:
+        return False
+    if "$ref" in property_schema:
+        # keywords beside a $ref are ignored
+        return {"allOf": [property_schema, *matches]}
+    return {**property_schema, "allOf": [*property_schema.get("allOf", []), *matches]}
+
+
+def _get_object_schema_data(schema: SchemaType) -> _ObjectSchemaData:
+    properties = schema.get("properties", {})
+    # dicts as ordered sets, so very wide objects are indexed in linear time
+    required_properties = tuple(dict.fromkeys(schema.get("required", [])))
+    required_set = set(required_properties)
+    optional_properties = tuple(p for p in properties if p not in required_set)
+    all_properties = required_properties + optional_properties
     additional_properties = schema.get("additionalProperties", True)
+    # a true schema allows any value, and a false one forbids the names it matches
+    pattern_properties = tuple(
+        (re.compile(pattern), {} if property_schema is True else property_schema)
+        for pattern, property_schema in schema.get("patternProperties", {}).items()
+    )
+
+    property_name_schema = None
+    if schema.get("propertyNames", True) is not False and (
+        additional_properties
+        or any(property_schema is not False for _, property_schema in pattern_properties)
+    ):
+        property_name_schema = _get_property_name_schema(schema, all_properties)
 
     return _ObjectSchemaData(
         required_properties=required_properties,
+        optional_properties=optional_properties,
         all_properties=all_properties,
         additional_properties=additional_properties,
+        property_schemas={
+            p: _get_property_schema(p, properties.get(p, {}), pattern_properties)
+            for p in all_properties
+        },
+        prompt_texts={
+            p: _get_property_prompt_text(p, p in required_set) for p in all_properties
+        },
+        pattern_properties=pattern_properties,
+        property_name_schema=property_name_schema,
+        shallow_schema=get_shallow_schema(schema),
     )
 
 
@@ -54,33 +180,50 @@ def _prompt_properties(
     schema_data: _ObjectSchemaData,
     context: Context,
 ):
-    required_properties = schema_data.required_properties
-    other_properties = [
-        p for p in schema_data.all_properties if p not in required_properties
-    ]
-
-    for property_name in required_properties:
-        property_schema = schema.get("properties", {}).get(property_name, {})
-        coda = " [REQUIRED]"
-
-        prompt_text = PromptText(
-            fixed_type=f"{property_name} [$type]{coda}: ",
-            selected_type=f"{property_name}{coda}: ",
-        )
+    for property_name in schema_data.required_properties:
+        property_schema = schema_data.property_schemas[property_name]
+        value_node = context.get_child_value_node(property_name)
+        if value_node is not None:
+            object[property_name] = use_set_value(
+                property_schema,
+                value_node,
+                input_handler=context.child_input_handler,
+                context=context,
+            )
+            continue
+        if property_schema is False:
+            continue
+        if not context.has_child_values(property_name):
+            static_value = get_static_value(property_schema, context=context)
+            if static_value is not None:
+                object[property_name] = static_value[0]
+                continue
+        prompt_text = schema_data.prompt_texts[property_name]
 
         value = prompt_from_schema(
             prompt_text, property_schema, context=context.subcontext(property_name)
         )
         object[property_name] = value
 
-    for property_name in other_properties:
-        property_schema = schema.get("properties", {}).get(property_name, {})
-        coda = " (CTRL-D to skip)"
-
-        prompt_text = PromptText(
-            fixed_type=f"{property_name} [$type]{coda}: ",
-            selected_type=f"{property_name}{coda}: ",
-        )
+    for property_name in schema_data.optional_properties:
+        property_schema = schema_data.property_schemas[property_name]
+        value_node = context.get_child_value_node(property_name)
+        if value_node is not None:
+            object[property_name] = use_set_value(
+                property_schema,
+                value_node,
+                input_handler=context.child_input_handler,
+                context=context,
+            )
+            continue
+        if property_schema is False:
+            continue
+        if not context.has_child_values(property_name):
+            static_value = get_static_value(property_schema, context=context)
+            if static_value is not None:
+                object[property_name] = static_value[0]
+                continue
+        prompt_text = schema_data.prompt_texts[property_name]
 
         try:
             value = prompt_from_schema(
@@ -98,39 +241,55 @@ def _prompt_additional_properties(
     schema_data: _ObjectSchemaData,
     context: Context,
 ):
-    if not schema_data.additional_properties:
+    if schema_data.property_name_schema is None:
         return
     while True:
         try:
             property_name = prompt_string(
                 "Enter a property name (CTRL+D to finish): ",
-                {"type": "string"},
+                schema_data.property_name_schema,
                 context=context.with_indent(),
             )
         except EOFError:
             break
         if property_name in object:
-            print(
-                context.input_handler.with_indent().print(
-                    "Property already exists", indent=True
-                )
+            context.input_handler.with_indent().print(
+                "Property already exists", indent=True
             )
             continue
-        value = prompt_from_types(
-            "Enter the property value: ",
-            ALL_JSON_TYPES,
-            context=context.subcontext(property_name),
-        )
+        property_schema = schema_data.get_entered_property_schema(property_name)
+        if property_schema is None:
+            message = f"Property {property_name!r} is not allowed"
+            patterns = [
+                pattern.pattern
+                for pattern, pattern_schema in schema_data.pattern_properties
+                if pattern_schema is not False
+            ]
+            if patterns and not schema_data.additional_properties:
+                message += "; names must match one of: " + ", ".join(patterns)
+            context.input_handler.with_indent().print(message, indent=True)
+            continue
+        if not property_schema:
+            value = prompt_from_types(
+                "Enter the property value: ",
+                ALL_JSON_TYPES,
+                context=context.subcontext(property_name),
+            )
+        else:
+            value = prompt_from_schema(
+                "Enter the property value: ",
+                property_schema,
+                context=context.subcontext(property_name),
+            )
         object[property_name] = value
 
 
 def prompt_object(prompt_text: str, schema: SchemaType, *, context: Context):
-    validator = context.get_validator(schema)
+    schema_data = context.get_schema_plan(schema).object_data
+    validator = context.get_own_validator(schema, schema_data.shallow_schema)
     if prompt_text:
         context.input_handler.print(prompt_text, indent=True)
 
-    schema_data = _get_object_schema_data(schema)
-
     while True:
         obj = {}
 
@@ -142,7 +301,13 @@ def prompt_object(prompt_text: str, schema: SchemaType, *, context: Context):
             object=obj, schema=schema, schema_data=schema_data, context=context
         )
 
-        errors = [e.message for e in validator.iter_errors(obj)]
+        errors = context.get_errors(validator, obj)
+        if errors and (
+            not context.input_handler.interactive
+            # filled in without input, so it would be the same after a reset
+            or context.get_static_value(schema) is not None
+        ):
+            raise PromptValidationError(context.path, obj, errors)
         if errors:
             indented_input_handler = context.input_handler.with_indent()
             indented_input_handler.print(
@@ -151,5 +316,6 @@ def prompt_object(prompt_text: str, schema: SchemaType, *, context: Context):
             indented_input_handler.print(
                 "Object has been reset", color="#ff0000", indent=True
             )
+            context.emit(RESET)
         else:
             return obj
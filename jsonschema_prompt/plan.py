@@ -0,0 +1,283 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+from typing import Any, Tuple, Optional, Mapping, Iterable, Dict
+
+from .types import SchemaType
+from .utils import find_types_in_schema
+from .refs import SchemaResolver
+from .object_prompter import _ObjectSchemaData, _get_object_schema_data
+from .array_prompter import _ArraySchemaData, _get_array_schema_data
+from .branch_prompter import _BranchData, _get_branch_data
+
+
+@dataclasses.dataclass(frozen=True)
+class SchemaPlan:
+    schema: SchemaType
+    types: Tuple[str, ...]
+    object_data: Optional[_ObjectSchemaData] = None
+    array_data: Optional[_ArraySchemaData] = None
+    branch_data: Optional[_BranchData] = None
+    # (value,) for a subtree that needs no input, with and without accepting defaults
+    static_value: Optional[Tuple[Any]] = None
+    default_static_value: Optional[Tuple[Any]] = None
+
+    def get_child_schemas(self) -> Iterable[SchemaType]:
+        if len(self.types) != 1:
+            # children of a schema with a selectable type are planned on demand
+            return
+        if self.object_data:
+            for property_schema in self.object_data.property_schemas.values():
+                # a false property is never prompted for
+                if property_schema is not False:
+                    yield property_schema
+        if self.array_data:
+            yield from self.array_data.indexed_items
+            if self.array_data.additional_items.allowed:
+                yield self.array_data.additional_items.schema
+
+    def get_planned_schemas(self) -> Iterable[SchemaType]:
+        # the children, the schemas of properties whose names are entered, and
+        # the branches that can be selected
+        if self.branch_data:
+            yield from self.branch_data.get_planned_schemas()
+        yield from self.get_child_schemas()
+        if len(self.types) == 1 and self.object_data:
+            yield from self.object_data.get_entered_property_schemas()
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanStats:
+    node_count: int
+    prompt_count: int
+    max_depth: int
+    # a recursive schema can be prompted arbitrarily deep; the counts stop at the cycle
+    recursive: bool = False
+    prompt_count_accepting_defaults: Optional[int] = None
+
+
+def build_schema_plan(
+    schema: SchemaType, resolver: Optional[SchemaResolver] = None
+) -> SchemaPlan:
+    types = tuple(find_types_in_schema(schema, resolver))
+    # an untyped schema can be prompted as any type, so it needs both
+    object_data = None
+    if not types or "object" in types:
+        object_data = _get_object_schema_data(schema)
+    array_data = None
+    if not types or "array" in types:
+        array_data = _get_array_schema_data(schema, resolver)
+    branch_data = None
+    if "oneOf" in schema or "anyOf" in schema:
+        branch_data = _get_branch_data(schema, resolver)
+    return SchemaPlan(
+        schema=schema,
+        types=types,
+        object_data=object_data,
+        array_data=array_data,
+        branch_data=branch_data,
+    )
+
+
+class StaticValues:
+    # finds subtrees that are filled in without any input: const, single-value
+    # enum and null schemas, with accept_defaults anything with a default, and
+    # closed objects whose properties all qualify
+    def __init__(
+        self,
+        resolver: Optional[SchemaResolver] = None,
+        accept_defaults: bool = False,
+        max_size: Optional[int] = None,
+    ) -> None:
+        self.resolver = resolver
+        self.accept_defaults = accept_defaults
+        self.max_size = max_size
+        # id -> (schema, value); the schema is kept so its id can't be reused
+        self._values: Dict[int, Tuple[SchemaType, Optional[Tuple[Any]]]] = {}
+        self._depth = 0
+
+    def get(self, schema: SchemaType) -> Optional[Tuple[Any]]:
+        if self.resolver is not None:
+            schema = self.resolver.resolve(schema)
+        key = id(schema)
+        entry = self._values.get(key)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        if self.max_size is not None and not self._depth:
+            if len(self._values) >= self.max_size:
+                self._values.clear()
+        # a schema that contains itself is never static
+        self._values[key] = (schema, None)
+        self._depth += 1
+        try:
+            value = self._find(schema)
+        finally:
+            self._depth -= 1
+        self._values[key] = (schema, value)
+        return value
+
+    def _find(self, schema: SchemaType) -> Optional[Tuple[Any]]:
+        if not isinstance(schema, dict):
+            return None
+        if "const" in schema:
+            return (schema["const"],)
+        if "enum" in schema and len(schema["enum"]) == 1:
+            return (schema["enum"][0],)
+        if self.accept_defaults and "default" in schema:
+            return (schema["default"],)
+        if "oneOf" in schema or "anyOf" in schema:
+            return None
+        types = find_types_in_schema(schema, self.resolver)
+        if len(types) != 1:
+            return None
+        if types[0] == "null":
+            return (None,)
+        if types[0] != "object":
+            return None
+        object_data = _get_object_schema_data(schema)
+        if object_data.property_name_schema is not None:
+            return None
+        value = {}
+        for property_name in object_data.all_properties:
+            property_value = self.get(object_data.property_schemas[property_name])
+            if property_value is None:
+                return None
+            value[property_name] = property_value[0]
+        return (value,)
+
+
+def _is_fixed(schema: SchemaType) -> bool:
+    return "const" in schema or ("enum" in schema and len(schema["enum"]) == 1)
+
+
+class CompiledSchema:
+    def __init__(
+        self,
+        schema: SchemaType,
+        plans: Mapping[int, SchemaPlan],
+        resolver: SchemaResolver,
+    ) -> None:
+        self.schema = schema
+        self.resolver = resolver
+        self._plans = dict(plans)
+        self.stats = self._compute_stats()
+
+    @property
+    def root(self) -> SchemaPlan:
+        return self._plans[id(self.resolver.resolve(self.schema))]
+
+    def get_plan(self, schema: SchemaType) -> Optional[SchemaPlan]:
+        return self._plans.get(id(schema))
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def __getstate__(self):
+        return {
+            "schema": self.schema,
+            "plans": list(self._plans.values()),
+            "resolver": self.resolver,
+        }
+
+    def __setstate__(self, state):
+        # plans are looked up by schema identity, which has to be rebuilt after unpickling
+        self.schema = state["schema"]
+        self.resolver = state["resolver"]
+        self._plans = {id(plan.schema): plan for plan in state["plans"]}
+        self.stats = self._compute_stats()
+
+    def _compute_stats(self) -> PlanStats:
+        self._recursive = False
+        self._accept_defaults = False
+        prompt_count, max_depth = self._count(self.root, 0, set())
+        self._accept_defaults = True
+        prompt_count_accepting_defaults, _ = self._count(self.root, 0, set())
+        return PlanStats(
+            node_count=len(self._plans),
+            prompt_count=prompt_count,
+            max_depth=max_depth,
+            recursive=self._recursive,
+            prompt_count_accepting_defaults=prompt_count_accepting_defaults,
+        )
+
+    def _count_children(self, child_schemas, depth, ancestors) -> Tuple[int, int]:
+        count, max_depth = 0, depth
+        for child_schema in child_schemas:
+            child_plan = self._plans[id(self.resolver.resolve(child_schema))]
+            if id(child_plan) in ancestors:
+                self._recursive = True
+                continue
+            child_count, child_depth = self._count(child_plan, depth + 1, ancestors)
+            count += child_count
+            max_depth = max(max_depth, child_depth)
+        return count, max_depth
+
+    def _count(self, plan: SchemaPlan, depth: int, ancestors) -> Tuple[int, int]:
+        if self._accept_defaults:
+            if plan.default_static_value is not None:
+                return 0, depth
+        elif plan.static_value is not None:
+            return 0, depth
+        if plan.branch_data is not None:
+            # selecting a branch, then the most prompts of any branch
+            ancestors.add(id(plan))
+            count, max_depth = 0, depth
+            for branch_schema in plan.branch_data.branch_schemas:
+                branch_count, branch_depth = self._count_children(
+                    [branch_schema], depth - 1, ancestors
+                )
+                count = max(count, branch_count)
+                max_depth = max(max_depth, branch_depth)
+            ancestors.discard(id(plan))
+            return count + 1, max_depth
+        if len(plan.types) != 1:
+            # type selection, then (at least) the value
+            return 2, depth
+        if plan.object_data or plan.array_data:
+            ancestors.add(id(plan))
+            count, max_depth = self._count_children(
+                plan.get_child_schemas(), depth, ancestors
+            )
+            ancestors.discard(id(plan))
+            if plan.object_data and plan.object_data.property_name_schema is not None:
+                count += 1
+            return count, max_depth
+        if plan.types[0] == "null" or _is_fixed(plan.schema):
+            return 0, depth
+        return 1, depth
+
+
+def compile_schema(schema: SchemaType) -> CompiledSchema:
+    resolver = SchemaResolver(schema)
+    plans: Dict[int, SchemaPlan] = {}
+    stack = [schema]
+    while stack:
+        # references are followed once each, so recursive schemas terminate
+        subschema = resolver.resolve(stack.pop())
+        if id(subschema) in plans:
+            continue
+        plan = build_schema_plan(subschema, resolver)
+        plans[id(subschema)] = plan
+        stack.extend(plan.get_planned_schemas())
+    # the static pass, stored on the plans so prompting can skip those subtrees
+    static_values = StaticValues(resolver)
+    default_static_values = StaticValues(resolver, accept_defaults=True)
+    for key, plan in plans.items():
+        plans[key] = dataclasses.replace(
+            plan,
+            static_value=static_values.get(plan.schema),
+            default_static_value=default_static_values.get(plan.schema),
+        )
+    return CompiledSchema(schema, plans, resolver)
@@ -12,14 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import functools
 import string
-from typing import List, Union, Optional, Any
+from typing import List, Union, Optional, Any, Tuple
 import dataclasses
 
 from .types import SchemaType
 from .utils import ALL_JSON_TYPES, find_types_in_schema
 from .context import Context
-from .exceptions import SetValueError
+from .events import RESET
+from .exceptions import PromptValidationError, SetValueError
+from .input import InputHandler
+from .set_values import SetValueNode
+
+
+@functools.lru_cache(maxsize=1024)
+def _substitute_type(template: str, type: str) -> str:
+    return string.Template(template).substitute({"type": type})
 
 
 @dataclasses.dataclass(frozen=True)
@@ -46,7 +56,7 @@ class PromptText:
             return ""
         if isinstance(prompt_text, cls):
             prompt_text = prompt_text.fixed_type
-        return string.Template(prompt_text).substitute({"type": type})
+        return _substitute_type(prompt_text, type)
 
     @classmethod
     def get_type_prompt_text(cls, prompt_text: Optional[Union["PromptText", str]]) -> str:
@@ -77,22 +87,69 @@ def prompt_from_types(
     return prompter(prompt_text, {"type": type}, context=context)
 
 
+def use_set_value(
+    schema: SchemaType,
+    value_node: SetValueNode,
+    *,
+    input_handler: InputHandler,
+    context: Context,
+) -> Any:
+    value = value_node.value
+    validator = context.get_validator(schema)
+    errors = context.get_errors(validator, value)
+    if errors:
+        from jsonpointer import JsonPointer
+
+        raise SetValueError(JsonPointer(value_node.path), value, "\n".join(errors))
+    input_handler.print(f"At path {value_node.path!r} using value {value}", indent=True)
+    return value
+
+
+def get_static_value(schema: SchemaType, *, context: Context) -> Optional[Tuple[Any]]:
+    static_value = context.get_static_value(schema)
+    if static_value is None:
+        return None
+    value = static_value[0]
+    if context.get_errors(context.get_validator(schema), value):
+        # an invalid default is prompted for instead, and an invalid const is
+        # reported by its prompter
+        return None
+    if isinstance(value, (dict, list)):
+        value = copy.deepcopy(value)
+    return (value,)
+
+
 def prompt_from_schema(
     prompt_text: str, schema: SchemaType, *, context: Context
 ) -> Any:
-    if context.has_value():
-        value = context.get_value()
-        validator = context.get_validator(schema)
-        errors = [e.message for e in validator.iter_errors(value)]
-        if errors:
-            raise SetValueError(context.path, value, "\n".join(errors))
-        context.input_handler.print(
-            f"At path {context.get_path_str()} using value {value}", indent=True
-        )
-        return value
-    if "$comment" in schema:
-        context.input_handler.print_instructions(schema["$comment"])
-    types = find_types_in_schema(schema)
+    if not context.hooks:
+        return _prompt_from_schema(prompt_text, schema, context=context)
+    return context.call_node(
+        _prompt_from_schema, prompt_text, schema, context=context
+    )
+
+
+def _select_branch(
+    prompt_text: str, schema: SchemaType, *, context: Context
+) -> Tuple[SchemaType, List[str]]:
+    # a oneOf/anyOf schema is prompted as the branch selected for it
+    schema_plan = context.get_schema_plan(schema)
+    if schema_plan.branch_data is not None:
+        branch_selector = context.get_branch_selector()
+        schema = branch_selector(prompt_text, schema_plan.branch_data, context=context)
+        schema_plan = context.get_schema_plan(schema)
+    return schema, schema_plan.types
+
+
+def _prompt_selected(prompt_text: str, schema: SchemaType, *, context: Context) -> Any:
+    # only the types are kept from the plan, which for a schema that wasn't
+    # compiled is rebuilt by the prompter
+    schema, types = _select_branch(prompt_text, schema, context=context)
+    if len(schema.get("enum") or ()) > 1:
+        # the allowed values are offered directly, whatever their types
+        type = types[0] if len(types) == 1 else "enum"
+        prompt_text = PromptText.get_fixed_type_prompt_text(prompt_text, type)
+        return context.get_prompter("enum")(prompt_text, schema, context=context)
     if len(types) == 1:
         type = types[0]
         prompt_text = PromptText.get_fixed_type_prompt_text(prompt_text, type)
@@ -103,3 +160,48 @@ def prompt_from_schema(
         prompt_text = PromptText.get_selected_type_prompt_text(prompt_text, type)
     prompter = context.get_prompter(type)
     return prompter(prompt_text, schema, context=context)
+
+
+def _prompt_exclusive(prompt_text: str, schema: SchemaType, *, context: Context) -> Any:
+    # a oneOf value is checked against every branch once it is complete, and
+    # the branch is selected again if it matches more than the one selected;
+    # a root array is kept until then rather than streamed
+    validator = context.get_validator(schema)
+    branch_context = context.without_item_sink()
+    while True:
+        value = _prompt_selected(prompt_text, schema, context=branch_context)
+        errors = context.get_errors(validator, value)
+        if not errors:
+            return value
+        if not context.input_handler.interactive:
+            raise PromptValidationError(context.path, value, errors)
+        indented_input_handler = context.input_handler.with_indent()
+        indented_input_handler.print("\n".join(errors), color="#ff0000", indent=True)
+        indented_input_handler.print(
+            "Value has been reset", color="#ff0000", indent=True
+        )
+        context.emit(RESET)
+
+
+def _prompt_from_schema(
+    prompt_text: str, schema: SchemaType, *, context: Context
+) -> Any:
+    schema = context.resolve(schema)
+    if context.has_value():
+        return use_set_value(
+            schema,
+            context.get_value_node(),
+            input_handler=context.input_handler,
+            context=context,
+        )
+    if context.get_value_node() is None:
+        static_value = get_static_value(schema, context=context)
+        if static_value is not None:
+            return static_value[0]
+    if "$comment" in schema:
+        context.input_handler.print_instructions(schema["$comment"])
+    if "oneOf" in schema:
+        branch_data = context.get_schema_plan(schema).branch_data
+        if branch_data is not None and branch_data.exclusive:
+            return _prompt_exclusive(prompt_text, schema, context=context)
+    return _prompt_selected(prompt_text, schema, context=context)
@@ -0,0 +1,144 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import threading
+from typing import Any, Dict, Optional
+
+from .types import SchemaType
+from .validator_cache import get_canonical_json, get_fingerprint
+
+
+@functools.lru_cache(maxsize=None)
+def _get_memoizing_ref_resolver_class():
+    import jsonschema
+
+    class MemoizingRefResolver(jsonschema.RefResolver):
+        # jsonschema re-resolves the fragment every time a validator follows a $ref
+        def __init__(self, *args, resolved_urls=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._resolved_urls = {} if resolved_urls is None else resolved_urls
+
+        def resolve_from_url(self, url):
+            try:
+                return self._resolved_urls[url]
+            except KeyError:
+                resolved = super().resolve_from_url(url)
+                self._resolved_urls[url] = resolved
+                return resolved
+
+    return MemoizingRefResolver
+
+
+class ThreadLocalRefResolver:
+    # a RefResolver keeps a stack of resolution scopes that it pushes and pops
+    # as a validator follows $refs, so validators shared between threads (by the
+    # validator cache) get this instead, which hands each thread its own
+    # resolver; the resolved documents themselves are shared
+    def __init__(self, root_schema: SchemaType) -> None:
+        self._root_schema = root_schema
+        self._resolved_urls = {}
+        self._local = threading.local()
+
+    def get_resolver(self) -> Any:
+        resolver = getattr(self._local, "resolver", None)
+        if resolver is None:
+            resolver_class = _get_memoizing_ref_resolver_class()
+            resolver = resolver_class.from_schema(
+                self._root_schema, resolved_urls=self._resolved_urls
+            )
+            self._local.resolver = resolver
+        return resolver
+
+    def __getattr__(self, name):
+        return getattr(self.get_resolver(), name)
+
+
+class SchemaResolver:
+    def __init__(self, root_schema: SchemaType) -> None:
+        self.root_schema = root_schema
+        self._lock = threading.Lock()
+        self._key = None
+        self._has_refs = None
+        self._ref_resolver = None
+        self._resolved: Dict[str, SchemaType] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {"root_schema": self.root_schema, "key": self._key, "has_refs": self._has_refs}
+
+    def __setstate__(self, state):
+        self.__init__(state["root_schema"])
+        self._key = state["key"]
+        self._has_refs = state["has_refs"]
+
+    def _fingerprint_root(self) -> None:
+        canonical_json = get_canonical_json(self.root_schema)
+        self._has_refs = '"$ref"' in canonical_json
+        self._key = get_fingerprint(canonical_json)
+
+    @property
+    def has_refs(self) -> bool:
+        if self._has_refs is None:
+            self._fingerprint_root()
+        return self._has_refs
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._fingerprint_root()
+        return self._key
+
+    @property
+    def ref_resolver(self) -> Any:
+        if self._ref_resolver is None:
+            with self._lock:
+                if self._ref_resolver is None:
+                    self._ref_resolver = ThreadLocalRefResolver(self.root_schema)
+        return self._ref_resolver
+
+    def _resolve_ref(self, ref: str) -> SchemaType:
+        try:
+            resolved = self._resolved[ref]
+            self.hits += 1
+            return resolved
+        except KeyError:
+            pass
+        _, resolved = self.ref_resolver.resolve(ref)
+        self._resolved[ref] = resolved
+        self.misses += 1
+        return resolved
+
+    def resolve(self, schema: Any) -> Any:
+        if not isinstance(schema, dict) or "$ref" not in schema:
+            return schema
+        seen = set()
+        while isinstance(schema, dict) and "$ref" in schema:
+            if id(schema) in seen:
+                import jsonschema
+
+                raise jsonschema.RefResolutionError(
+                    f"Circular reference {schema['$ref']!r}"
+                )
+            seen.add(id(schema))
+            # in draft 7, keywords alongside $ref are ignored
+            schema = self._resolve_ref(schema["$ref"])
+        return schema
+
+
+def resolve(schema: Any, resolver: Optional[SchemaResolver]) -> Any:
+    if resolver is None:
+        return schema
+    return resolver.resolve(schema)
@@ -12,29 +12,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Optional, List
+from typing import Any, Optional, List
 
 from .types import SchemaType
 from .context import Context
+from .exceptions import PromptValidationError
 from .utils import get_type_completer, multiline_continuation
-from .validators import (
-    get_type_validator,
-    JSONSchemaValidator,
-    StringJSONSchemaValidator,
+from .enum_index import get_enum_index, get_value_text
+
+# keywords that don't constrain the value, so an enum needs no further check
+_ANNOTATION_KEYWORDS = frozenset(
+    ["enum", "type", "title", "description", "default", "examples", "$comment"]
 )
 
 
 def _check_const(schema):
     if "const" in schema:
         return True, schema["const"]
-    if "enum" in schema and len(schema["enum"] == 1):
+    if "enum" in schema and len(schema["enum"]) == 1:
         return True, schema["enum"][0]
     return False, None
 
 
+def _use_fixed_value(value: Any, schema: SchemaType, *, context: Context) -> Any:
+    # no answer can change a const or null value, so one the rest of the schema
+    # rejects is an error rather than a prompt
+    errors = context.get_errors(context.get_validator(schema), value)
+    if errors:
+        raise PromptValidationError(context.path, value, errors)
+    return value
+
+
 def prompt_type(
     prompt_text: str, types: Optional[List[str]], *, context: Context
 ) -> str:
+    context.input_handler.require_interactive(prompt_text)
+    from .validators import get_type_validator
+
     type = context.input_handler.get_string(
         message=prompt_text,
         validator=get_type_validator(types),
@@ -46,11 +60,21 @@ def prompt_type(
 def prompt_string(prompt_text: str, schema: SchemaType, *, context: Context) -> str:
     has_const, const_value = _check_const(schema)
     if has_const:
-        return const_value
+        return _use_fixed_value(const_value, schema, context=context)
+    context.input_handler.require_interactive(prompt_text)
+    from .validators import StringJSONSchemaValidator
+
+    live = context.input_handler.validate_while_typing
     validator = StringJSONSchemaValidator(
-        schema, validator_factory=context.get_validator_factory()
+        schema, validator_factory=context.get_validator_factory(),
+        live=live,
+        emit=context.emit if context.hooks else None,
     )
     kwargs = {}
+    if schema.get("examples"):
+        from .completers import EnumCompleter
+
+        kwargs["completer"] = EnumCompleter(get_enum_index((), schema["examples"]))
     if schema.get("multiline", False) is True:
         kwargs["multiline"] = True
         kwargs["prompt_continuation"] = multiline_continuation
@@ -60,32 +84,75 @@ def prompt_string(prompt_text: str, schema: SchemaType, *, context: Context) ->
         else:
             kwargs["default"] = schema["default"]
     return context.input_handler.get_string(
-        message=prompt_text, validator=validator, validate_while_typing=False, **kwargs
+        message=prompt_text, validator=validator, validate_while_typing=live, **kwargs
     )
 
 
 def prompt_number(prompt_text: str, schema: SchemaType, *, context: Context) -> float:
     has_const, const_value = _check_const(schema)
     if has_const:
-        return const_value
+        return _use_fixed_value(const_value, schema, context=context)
+    context.input_handler.require_interactive(prompt_text)
+    from .validators import JSONSchemaValidator
+
+    live = context.input_handler.validate_while_typing
     validator = JSONSchemaValidator(
-        schema, validator_factory=context.get_validator_factory()
+        schema, validator_factory=context.get_validator_factory(),
+        live=live,
+        emit=context.emit if context.hooks else None,
     )
     kwargs = {}
     if isinstance(schema.get("default"), float):
         kwargs["default"] = schema["default"]
     return context.input_handler.get_number(
-        message=prompt_text, validator=validator, validate_while_typing=False, **kwargs
+        message=prompt_text, validator=validator, validate_while_typing=live, **kwargs
     )
 
 
 def prompt_boolean(prompt_text: str, schema: SchemaType, *, context: Context) -> bool:
     has_const, const_value = _check_const(schema)
     if has_const:
-        return const_value
-    kwargs = {}
-    return context.input_handler.get_boolean(message=prompt_text, **kwargs)
+        return _use_fixed_value(const_value, schema, context=context)
+    validator = context.get_validator(schema)
+    while True:
+        value = context.input_handler.get_boolean(message=prompt_text)
+        errors = context.get_errors(validator, value)
+        if not errors:
+            return value
+        if not context.input_handler.interactive:
+            raise PromptValidationError(context.path, value, errors)
+        context.input_handler.with_indent().print(
+            "\n".join(errors), color="#ff0000", indent=True
+        )
 
 
 def prompt_null(prompt_text: str, schema: SchemaType, *, context: Context) -> None:
-    return None
+    return _use_fixed_value(None, schema, context=context)
+
+
+def prompt_enum(prompt_text: str, schema: SchemaType, *, context: Context) -> Any:
+    has_const, const_value = _check_const(schema)
+    if has_const:
+        return _use_fixed_value(const_value, schema, context=context)
+    context.input_handler.require_interactive(prompt_text)
+    from .completers import EnumCompleter
+    from .validators import EnumValidator
+
+    # membership is a hash lookup, so jsonschema never scans the enum
+    index = get_enum_index(schema["enum"], schema.get("examples") or ())
+    schema_validator = None
+    if not _ANNOTATION_KEYWORDS.issuperset(schema):
+        schema_validator = context.get_validator(
+            {k: v for k, v in schema.items() if k != "enum"}
+        )
+    kwargs = {}
+    if "default" in schema:
+        kwargs["default"] = get_value_text(schema["default"])
+    text = context.input_handler.get_string(
+        message=prompt_text,
+        validator=EnumValidator(index, schema_validator=schema_validator),
+        completer=EnumCompleter(index),
+        validate_while_typing=False,
+        **kwargs,
+    )
+    return index.lookup(text)
@@ -0,0 +1,251 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+from .types import SchemaType
+
+CACHE_DIR_ENV_VAR = "JSONSCHEMA_PROMPT_CACHE_DIR"
+
+_CACHE_FORMAT_VERSION = 5
+
+
+def get_cache_dir() -> str:
+    if os.environ.get(CACHE_DIR_ENV_VAR):
+        return os.environ[CACHE_DIR_ENV_VAR]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "jsonschema-prompt")
+
+
+def _get_config_dir() -> str:
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+    return os.path.join(base, "jsonschema-prompt")
+
+
+_SIGNING_KEY_SIZE = 32
+# HMAC-SHA256
+_SIGNATURE_SIZE = 32
+_signing_key = None
+
+
+def _read_signing_key(key_path: str) -> Optional[bytes]:
+    try:
+        with open(key_path, "rb") as fp:
+            key = fp.read()
+    except OSError:
+        return None
+    return key if len(key) == _SIGNING_KEY_SIZE else None
+
+
+def _load_signing_key() -> Optional[bytes]:
+    key_path = os.path.join(_get_config_dir(), "cache.key")
+    if os.path.exists(key_path):
+        return _read_signing_key(key_path)
+    try:
+        os.makedirs(os.path.dirname(key_path), mode=0o700, exist_ok=True)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # created by a concurrent run
+        return _read_signing_key(key_path)
+    except OSError:
+        return None
+    key = os.urandom(_SIGNING_KEY_SIZE)
+    with os.fdopen(fd, "wb") as fp:
+        fp.write(key)
+    return key
+
+
+def get_signing_key() -> Optional[bytes]:
+    # loading a cache file unpickles or executes it, and the cache directory can
+    # be pointed anywhere, so files are signed and only loaded if the signature
+    # matches; the key is kept outside the cache directory, readable only by the
+    # user. None if there's no key, and then nothing is cached
+    global _signing_key
+    if _signing_key is None:
+        _signing_key = _load_signing_key() or b""
+    return _signing_key or None
+
+
+def _sign(key: bytes, payload: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).digest()
+
+
+def read_signed_file(path: str) -> Optional[bytes]:
+    key = get_signing_key()
+    if key is None:
+        return None
+    try:
+        with open(path, "rb") as fp:
+            data = fp.read()
+    except OSError:
+        return None
+    signature, payload = data[:_SIGNATURE_SIZE], data[_SIGNATURE_SIZE:]
+    if not hmac.compare_digest(signature, _sign(key, payload)):
+        return None
+    return payload
+
+
+def write_signed_file(directory: str, path: str, payload: bytes) -> None:
+    key = get_signing_key()
+    if key is None:
+        return
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(_sign(key, payload))
+                fp.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        # the cache is an optimization; a read-only or full disk shouldn't fail the run
+        pass
+
+
+def _load_yaml(text: str) -> Any:
+    import yaml
+
+    # the C loader is many times faster than the pure-Python one on large files
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(text, Loader=loader)
+
+
+def parse_schema(text: str, *, filename: Optional[str] = None) -> SchemaType:
+    if filename and filename.lower().endswith((".yaml", ".yml")):
+        return _load_yaml(text)
+    # JSON is parsed without importing yaml; anything else is tried as YAML
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            import yaml
+        except ModuleNotFoundError:
+            pass
+        else:
+            return _load_yaml(text)
+        raise
+
+
+@dataclasses.dataclass
+class _CacheEntry:
+    version: int
+    path: str
+    mtime_ns: int
+    size: int
+    content_hash: str
+    schema: SchemaType
+    compiled_schema: Any = None
+
+
+def _get_entry_path(cache_dir: str, path: str) -> str:
+    name = hashlib.sha256(path.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, name + ".pickle")
+
+
+def _read_entry(entry_path: str) -> Optional[_CacheEntry]:
+    # unpickling runs arbitrary code, so only entries signed here are loaded
+    data = read_signed_file(entry_path)
+    if data is None:
+        return None
+    try:
+        entry = pickle.loads(data)
+    except Exception:
+        # written by an incompatible version
+        return None
+    if not isinstance(entry, _CacheEntry) or entry.version != _CACHE_FORMAT_VERSION:
+        return None
+    return entry
+
+
+def _write_entry(cache_dir: str, entry_path: str, entry: _CacheEntry) -> None:
+    data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+    write_signed_file(cache_dir, entry_path, data)
+
+
+@dataclasses.dataclass(frozen=True)
+class LoadedSchema:
+    schema: SchemaType
+    compiled_schema: Any = None
+
+
+def _compile(schema: SchemaType):
+    from .plan import compile_schema
+
+    return compile_schema(schema)
+
+
+def load_schema_file(
+    path: str,
+    *,
+    cache_dir: Optional[str] = None,
+    use_cache: bool = True,
+    with_plan: bool = False,
+) -> LoadedSchema:
+    path = os.path.abspath(path)
+    if not use_cache:
+        with open(path, "r") as fp:
+            schema = parse_schema(fp.read(), filename=path)
+        return LoadedSchema(schema, _compile(schema) if with_plan else None)
+
+    cache_dir = cache_dir or get_cache_dir()
+    entry_path = _get_entry_path(cache_dir, path)
+    stat = os.stat(path)
+    entry = _read_entry(entry_path)
+    if entry is not None and entry.path != path:
+        entry = None
+
+    if (
+        entry is None
+        or entry.mtime_ns != stat.st_mtime_ns
+        or entry.size != stat.st_size
+    ):
+        with open(path, "rb") as fp:
+            content = fp.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry.content_hash == content_hash:
+            # touched but unchanged
+            entry.mtime_ns = stat.st_mtime_ns
+            entry.size = stat.st_size
+        else:
+            entry = _CacheEntry(
+                version=_CACHE_FORMAT_VERSION,
+                path=path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                content_hash=content_hash,
+                schema=parse_schema(content.decode("utf-8"), filename=path),
+            )
+        if with_plan:
+            if entry.compiled_schema is None:
+                entry.compiled_schema = _compile(entry.schema)
+        _write_entry(cache_dir, entry_path, entry)
+    elif with_plan and entry.compiled_schema is None:
+        entry.compiled_schema = _compile(entry.schema)
+        _write_entry(cache_dir, entry_path, entry)
+
+    return LoadedSchema(entry.schema, entry.compiled_schema if with_plan else None)
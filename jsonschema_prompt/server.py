@@ -0,0 +1,368 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Serves prompt sessions over a unix or TCP socket, one session per connection,
+# all on one event loop. Schemas are compiled once when the server starts, and
+# sessions share the validator cache and validation backend. Each session's
+# schema walk also holds a thread while it waits for answers (see
+# async_prompt.py), so at most max_sessions run at once; further connections
+# are sent an error and closed.
+#
+# Each side sends one JSON object per line. The client starts a session with
+#     {"schema": name, "set_values": {...}, "accept_defaults": false}
+# (schema can be left out if the server has only one; set_values are merged
+# over the server's own, and accept_defaults defaults to the server's), then
+# the server sends
+#     {"type": "prompt", "kind": "string", "message": ..., "default": ...,
+#      "multiline": ...}
+#     {"type": "prompt", "kind": "boolean", "message": ...}
+#     {"type": "print", "message": ...}
+#     {"type": "invalid", "message": ...}  the answer was rejected, the prompt follows
+#     {"type": "done", "value": ...}       or {"type": "error", "message": ...}
+# (an error is also sent, instead of any prompt, if the start message is invalid
+# or the server is full)
+# and the client answers each prompt with {"answer": ...} or {"eof": true} (CTRL-D).
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import socket
+from typing import Any, Mapping, Optional, Union
+
+from .async_prompt import AsyncInputHandler, prompt_async
+from .backends import ValidationBackend
+from .exceptions import MissingAnswerError, PromptValidationError, SetValueError
+from .input import get_plain_text
+from .plan import CompiledSchema, compile_schema
+from .types import SchemaType
+from .validator_cache import ValidatorCache, DEFAULT_VALIDATOR_CACHE
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Optional[dict]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        message = json.loads(line)
+    except json.JSONDecodeError:
+        raise ProtocolError("Messages must be JSON, one per line")
+    if not isinstance(message, dict):
+        raise ProtocolError("Messages must be JSON objects")
+    return message
+
+
+def _check_start_message(start: dict) -> None:
+    unknown = set(start) - {"schema", "set_values", "accept_defaults"}
+    if unknown:
+        raise ProtocolError(f"Unknown start fields: {', '.join(sorted(unknown))}")
+    if not isinstance(start.get("schema", ""), str):
+        raise ProtocolError("schema must be a string")
+    set_values = start.get("set_values", {})
+    if not isinstance(set_values, dict):
+        raise ProtocolError("set_values must be an object of JSON pointers to values")
+    for pointer in set_values:
+        if pointer and not pointer.startswith("/"):
+            raise ProtocolError(f"Invalid JSON pointer in set_values: {pointer!r}")
+    if not isinstance(start.get("accept_defaults", False), bool):
+        raise ProtocolError("accept_defaults must be a boolean")
+
+
+class _Session:
+    def __init__(
+        self,
+        server: "PromptServer",
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.input_handler = AsyncInputHandler(
+            str_handler=self._get_string,
+            bool_handler=self._get_boolean,
+            print_handler=self._print,
+        )
+
+    async def _send(self, message: dict) -> None:
+        self.writer.write(_encode(message))
+        await self.writer.drain()
+
+    async def _receive_answer(self) -> Any:
+        message = await _read_message(self.reader)
+        if message is None:
+            raise ConnectionResetError("Client disconnected")
+        if message.get("eof"):
+            raise EOFError
+        if "answer" not in message:
+            raise ProtocolError("Expected an answer")
+        return message["answer"]
+
+    async def _get_string(
+        self,
+        *,
+        message: Any,
+        validator=None,
+        default: Optional[str] = None,
+        multiline: bool = False,
+        **kwargs,
+    ) -> str:
+        prompt_message = {
+            "type": "prompt",
+            "kind": "string",
+            "message": get_plain_text(message),
+            "multiline": bool(multiline),
+        }
+        if default is not None:
+            prompt_message["default"] = default
+        while True:
+            await self._send(prompt_message)
+            answer = await self._receive_answer()
+            text = answer if isinstance(answer, str) else json.dumps(answer)
+            if validator is None:
+                return text
+            error = await self.server.validate_answer(validator, text)
+            if error is None:
+                return text
+            await self._send({"type": "invalid", "message": error})
+
+    async def _get_boolean(self, *, message: Any, **kwargs) -> bool:
+        await self._send(
+            {"type": "prompt", "kind": "boolean", "message": get_plain_text(message)}
+        )
+        return bool(await self._receive_answer())
+
+    async def _print(self, message: Any) -> None:
+        await self._send({"type": "print", "message": get_plain_text(message)})
+
+    async def run(self) -> None:
+        try:
+            start = await _read_message(self.reader)
+            if start is None:
+                return
+            _check_start_message(start)
+            schema = self.server.get_schema(start.get("schema"))
+            value = await prompt_async(
+                schema,
+                set_values={**self.server.set_values, **start.get("set_values", {})},
+                validator_cache=self.server.validator_cache,
+                input_handler=self.input_handler,
+                executor=self.server.executor,
+                validation_backend=self.server.validation_backend,
+                accept_defaults=start.get(
+                    "accept_defaults", self.server.accept_defaults
+                ),
+                shallow_validation=self.server.shallow_validation,
+                full_validation=self.server.full_validation,
+            )
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except (
+            ProtocolError,
+            SetValueError,
+            PromptValidationError,
+            MissingAnswerError,
+        ) as e:
+            await self._send({"type": "error", "message": str(e)})
+        except EOFError:
+            await self._send({"type": "error", "message": "Cancelled"})
+        except Exception as e:
+            # the session ends either way, but the client should hear why
+            await self._send(
+                {"type": "error", "message": f"{type(e).__name__}: {e}"}
+            )
+        else:
+            await self._send({"type": "done", "value": value})
+
+
+class PromptServer:
+    def __init__(
+        self,
+        schemas: Mapping[str, Union[SchemaType, CompiledSchema]],
+        *,
+        validator_cache: Optional[ValidatorCache] = DEFAULT_VALIDATOR_CACHE,
+        validation_backend: Optional[ValidationBackend] = None,
+        max_sessions: int = 64,
+        set_values: Optional[Mapping[str, Any]] = None,
+        accept_defaults: bool = False,
+        shallow_validation: bool = False,
+        full_validation: bool = False,
+    ) -> None:
+        self.schemas = {
+            name: (
+                schema if isinstance(schema, CompiledSchema) else compile_schema(schema)
+            )
+            for name, schema in schemas.items()
+        }
+        self.validator_cache = validator_cache
+        self.validation_backend = validation_backend
+        self.max_sessions = max_sessions
+        # for every session
+        self.set_values = dict(set_values or {})
+        self.accept_defaults = accept_defaults
+        self.shallow_validation = shallow_validation
+        self.full_validation = full_validation
+        # every active session holds a thread while it waits for an answer, so
+        # answers are validated on a separate pool that can't be starved by them
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_sessions, thread_name_prefix="prompt-session"
+        )
+        self._validation_executor = concurrent.futures.ThreadPoolExecutor(
+            min(4, max_sessions), thread_name_prefix="prompt-validation"
+        )
+        self.active_sessions = 0
+        self._local_tasks = set()
+
+    def get_schema(self, name: Optional[str]) -> CompiledSchema:
+        if name is None and len(self.schemas) == 1:
+            return next(iter(self.schemas.values()))
+        try:
+            return self.schemas[name]
+        except KeyError:
+            raise ProtocolError(
+                f"Unknown schema {name!r}, must be one of: {', '.join(self.schemas)}"
+            )
+
+    async def validate_answer(self, validator, text: str) -> Optional[str]:
+        from prompt_toolkit.document import Document
+        from prompt_toolkit.validation import ValidationError
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._validation_executor, validator.validate, Document(text)
+            )
+        except ValidationError as e:
+            return e.message
+        return None
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # over the limit, the client is told so rather than left waiting,
+        # unanswered, for a session thread to free up
+        full = self.active_sessions >= self.max_sessions
+        if not full:
+            self.active_sessions += 1
+        try:
+            if full:
+                message = f"Server is full ({self.max_sessions} sessions)"
+                writer.write(_encode({"type": "error", "message": message}))
+                await writer.drain()
+            else:
+                await _Session(self, reader, writer).run()
+        except ConnectionError:
+            pass
+        finally:
+            if not full:
+                self.active_sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, address: str) -> asyncio.AbstractServer:
+        # "unix:/path/to/socket" or "host:port"
+        if address.startswith("unix:"):
+            path = address[len("unix:") :]
+            if os.path.exists(path):
+                os.unlink(path)
+            return await asyncio.start_unix_server(self.handle_connection, path)
+        host, _, port = address.rpartition(":")
+        return await asyncio.start_server(
+            self.handle_connection, host or None, int(port)
+        )
+
+    async def serve_forever(self, address: str) -> None:
+        server = await self.start(address)
+        async with server:
+            await server.serve_forever()
+
+    async def connect_local(self) -> "SessionClient":
+        # a client connected over a socket pair, without listening on an address
+        client_sock, server_sock = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=server_sock)
+        task = asyncio.ensure_future(self.handle_connection(reader, writer))
+        self._local_tasks.add(task)
+        task.add_done_callback(self._local_tasks.discard)
+        return SessionClient(*await asyncio.open_connection(sock=client_sock))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self._validation_executor.shutdown(wait=False)
+
+
+class SessionClient:
+    def __init__(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address: str) -> "SessionClient":
+        if address.startswith("unix:"):
+            return cls(*await asyncio.open_unix_connection(address[len("unix:") :]))
+        host, _, port = address.rpartition(":")
+        return cls(*await asyncio.open_connection(host or None, int(port)))
+
+    async def _send(self, message: dict) -> None:
+        self.writer.write(_encode(message))
+        await self.writer.drain()
+
+    async def start(
+        self,
+        schema: Optional[str] = None,
+        *,
+        set_values: Optional[Mapping[str, Any]] = None,
+        accept_defaults: bool = False,
+    ) -> None:
+        message = {
+            "set_values": dict(set_values or {}),
+            "accept_defaults": accept_defaults,
+        }
+        if schema is not None:
+            message["schema"] = schema
+        await self._send(message)
+
+    async def receive(self) -> Optional[dict]:
+        return await _read_message(self.reader)
+
+    async def receive_prompt(self) -> Optional[dict]:
+        # skips printed messages; returns the next prompt, or the session's result
+        while True:
+            message = await self.receive()
+            if message is None or message["type"] != "print":
+                return message
+
+    async def answer(self, answer: Any) -> None:
+        await self._send({"answer": answer})
+
+    async def eof(self) -> None:
+        await self._send({"eof": True})
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
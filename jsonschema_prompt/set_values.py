@@ -0,0 +1,187 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    TYPE_CHECKING,
+)
+
+from .exceptions import SetValueError
+
+if TYPE_CHECKING:
+    from jsonpointer import JsonPointer
+
+
+def _set_value_error(path: str, value: Any, message: str) -> SetValueError:
+    from jsonpointer import JsonPointer
+
+    return SetValueError(JsonPointer(path), value, message)
+
+
+class SetValueNode:
+    __slots__ = ("path", "children", "has_value", "value")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.children: Dict[str, "SetValueNode"] = {}
+        self.has_value = False
+        self.value = None
+
+    def get_child(self, element: Union[str, int]) -> Optional["SetValueNode"]:
+        return self.children.get(str(element))
+
+    def get_descendant(self, parts: Sequence[str]) -> Optional["SetValueNode"]:
+        node = self
+        for part in parts:
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def add(self, parts: Sequence[str], value: Any) -> None:
+        node = self
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                escaped = part.replace("~", "~0").replace("/", "~1")
+                child = SetValueNode(f"{node.path}/{escaped}")
+                node.children[part] = child
+            node = child
+        node.has_value = True
+        node.value = value
+
+    def remove(self, parts: Sequence[str]) -> None:
+        if not parts:
+            self.children.clear()
+            self.has_value = False
+            self.value = None
+            return
+        parent = self.get_descendant(parts[:-1])
+        if parent is not None:
+            parent.children.pop(parts[-1], None)
+
+    def items(self) -> Iterator[Tuple["JsonPointer", Any]]:
+        from jsonpointer import JsonPointer
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.has_value:
+                yield JsonPointer(node.path), node.value
+            stack.extend(reversed(list(node.children.values())))
+
+    def __bool__(self) -> bool:
+        return self.has_value or bool(self.children)
+
+
+def build_set_values_trie(values: Optional[Mapping]) -> SetValueNode:
+    root = SetValueNode("")
+    if not values:
+        return root
+    from jsonpointer import JsonPointer
+
+    for key, value in values.items():
+        if not isinstance(key, JsonPointer):
+            key = JsonPointer(key)
+        root.add(key.parts, value)
+    return root
+
+
+_MISSING = object()
+
+
+def _merge_value(container: Any, part: str, node: SetValueNode) -> Any:
+    value = node.value
+    if isinstance(container, dict):
+        if part in container:
+            existing = container[part]
+            if existing != value:
+                raise _set_value_error(
+                    node.path, value, f"Mismatch with existing value {existing!r}"
+                )
+            return existing
+        container[part] = value
+        return value
+    if isinstance(container, list):
+        if part == "-":
+            container.append(value)
+            return value
+        if not part.isdigit() or (part != "0" and part.startswith("0")):
+            raise _set_value_error(
+                node.path, value, f"'{part}' is not a valid sequence index"
+            )
+        index = int(part)
+        if index < len(container):
+            existing = container[index]
+            if existing != value:
+                raise _set_value_error(
+                    node.path, value, f"Mismatch with existing value {existing!r}"
+                )
+            return existing
+        if index == len(container):
+            container.append(value)
+            return value
+        raise _set_value_error(node.path, value, f"index '{part}' is out of bounds")
+    raise _set_value_error(
+        node.path, value, f"Document '{container!r}' does not support indexing"
+    )
+
+
+def _get_child(container: Any, part: str) -> Any:
+    if isinstance(container, dict):
+        return container.get(part, _MISSING)
+    if isinstance(container, list) and part.isdigit():
+        index = int(part)
+        if index < len(container):
+            return container[index]
+    return _MISSING
+
+
+def _first_value(node: SetValueNode) -> SetValueNode:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.has_value:
+            return node
+        stack.extend(node.children.values())
+
+
+def merge_set_values(result: Any, root: SetValueNode) -> Any:
+    if root.has_value and root.value != result:
+        raise _set_value_error("", root.value, f"Mismatch with existing value {result!r}")
+    stack = [(result, root)]
+    while stack:
+        container, node = stack.pop()
+        for part, child in node.children.items():
+            if child.has_value:
+                child_container = _merge_value(container, part, child)
+            else:
+                child_container = _get_child(container, part)
+                if child_container is _MISSING:
+                    missing = _first_value(child)
+                    raise _set_value_error(
+                        missing.path,
+                        missing.value,
+                        f"member '{part}' not found in {container!r}",
+                    )
+            if child.children:
+                stack.append((child_container, child))
+    return result
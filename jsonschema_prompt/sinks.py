@@ -0,0 +1,71 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import abc
+import json
+from typing import Any, IO
+
+NDJSON = "ndjson"
+JSON_ARRAY = "json-array"
+
+FORMATS = [NDJSON, JSON_ARRAY]
+
+
+class OutputSink(abc.ABC):
+    def __init__(self, fp: IO[str]) -> None:
+        self.fp = fp
+        self.count = 0
+
+    @abc.abstractmethod
+    def write(self, value: Any) -> None:
+        pass
+
+    def close(self) -> None:
+        self.fp.flush()
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class NDJSONSink(OutputSink):
+    def write(self, value: Any) -> None:
+        # flushed per value, so a crash loses at most the value being entered
+        self.fp.write(json.dumps(value) + "\n")
+        self.fp.flush()
+        self.count += 1
+
+
+class JSONArraySink(OutputSink):
+    # the closing bracket is only written by close(); until then the file
+    # holds every value so far, one per line after the opening bracket
+    def write(self, value: Any) -> None:
+        separator = "[\n" if self.count == 0 else ",\n"
+        self.fp.write(separator + json.dumps(value))
+        self.fp.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        self.fp.write("\n]\n" if self.count else "[]\n")
+        super().close()
+
+
+def get_sink(fp: IO[str], format: str = NDJSON) -> OutputSink:
+    if format == NDJSON:
+        return NDJSONSink(fp)
+    if format == JSON_ARRAY:
+        return JSONArraySink(fp)
+    raise ValueError(f"Unknown output format {format!r}, must be one of: {', '.join(FORMATS)}")
@@ -0,0 +1,68 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Scripted answers for driving prompt() from tests and benchmarks.
+
+import collections
+from typing import Any, Iterable
+
+from .input import InputHandler, get_plain_text
+
+
+class ScriptedAnswers:
+    # answers the prompts in order, rejecting an answer the prompt's validator
+    # rejects as prompt_toolkit would, and recording each prompt's outcome;
+    # EOFError in the answers stands for CTRL-D
+    def __init__(self, answers: Iterable[Any], *, keep_printed: bool = True) -> None:
+        self.answers = collections.deque(answers)
+        self.rejected = []
+        self.printed = []
+        self.keep_printed = keep_printed
+
+    def _next_answer(self) -> Any:
+        if not self.answers:
+            raise AssertionError("Prompted with no answers left")
+        answer = self.answers.popleft()
+        if answer is EOFError:
+            raise EOFError
+        return answer
+
+    def get_string(self, *, validator=None, **kwargs) -> str:
+        from prompt_toolkit.document import Document
+        from prompt_toolkit.validation import ValidationError
+
+        while True:
+            answer = self._next_answer()
+            try:
+                if validator is not None:
+                    validator.validate(Document(answer))
+            except ValidationError as e:
+                self.rejected.append((answer, e.message))
+                continue
+            return answer
+
+    def get_boolean(self, **kwargs) -> bool:
+        return self._next_answer()
+
+    def print(self, message: Any) -> None:
+        if self.keep_printed:
+            self.printed.append(get_plain_text(message))
+
+    @property
+    def input_handler(self) -> InputHandler:
+        return InputHandler(
+            str_handler=self.get_string,
+            bool_handler=self.get_boolean,
+            print_handler=self.print,
+        )
@@ -0,0 +1,124 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Writes session events in the Chrome trace event format, which can be loaded
+# in chrome://tracing or https://ui.perfetto.dev, with per-path latency
+# histograms under "metadata".
+
+import collections
+import json
+import os
+import threading
+from typing import Dict, IO, List
+
+from .events import Event, NODE_ENTER, NODE_EXIT
+
+
+class LatencyHistogram:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        # power-of-two bucket upper bound in microseconds -> count
+        self.buckets: Dict[int, int] = collections.Counter()
+
+    def add(self, duration_ns: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.buckets[1 << max(duration_ns // 1000, 1).bit_length()] += 1
+
+    def to_json(self) -> dict:
+        return {
+            "count": self.count,
+            "total_us": self.total_ns // 1000,
+            "mean_us": self.total_ns // 1000 // self.count if self.count else 0,
+            "max_us": self.max_ns // 1000,
+            "buckets_us": {str(k): v for k, v in sorted(self.buckets.items())},
+        }
+
+
+class PathHistograms:
+    def __init__(self) -> None:
+        # event type -> path pattern -> histogram
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    def __call__(self, event: Event) -> None:
+        if event.duration_ns is None:
+            return
+        by_path = self.histograms.setdefault(event.type, {})
+        histogram = by_path.get(event.path_pattern)
+        if histogram is None:
+            histogram = by_path[event.path_pattern] = LatencyHistogram()
+        histogram.add(event.duration_ns)
+
+    def to_json(self) -> dict:
+        return {
+            type: {path: h.to_json() for path, h in sorted(by_path.items())}
+            for type, by_path in self.histograms.items()
+        }
+
+
+class ChromeTraceSink:
+    def __init__(self) -> None:
+        self.trace_events: List[dict] = []
+        self.histograms = PathHistograms()
+        self._start_ns = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _get_ts(self, timestamp_ns: int) -> float:
+        return (timestamp_ns - self._start_ns) / 1000
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            if self._start_ns is None:
+                self._start_ns = event.timestamp_ns - (event.duration_ns or 0)
+            self.histograms(event)
+            trace_event = {
+                "name": event.path or "/",
+                "cat": event.type,
+                "pid": self._pid,
+                "tid": threading.get_ident(),
+            }
+            if event.type == NODE_ENTER:
+                trace_event.update(ph="B", ts=self._get_ts(event.timestamp_ns))
+            elif event.type == NODE_EXIT:
+                trace_event.update(ph="E", ts=self._get_ts(event.timestamp_ns))
+            elif event.duration_ns is not None:
+                trace_event.update(
+                    ph="X",
+                    name=event.type,
+                    ts=self._get_ts(event.timestamp_ns - event.duration_ns),
+                    dur=event.duration_ns / 1000,
+                )
+            else:
+                trace_event.update(
+                    ph="i", s="t", name=event.type, ts=self._get_ts(event.timestamp_ns)
+                )
+            if event.type not in (NODE_ENTER, NODE_EXIT) or event.data:
+                trace_event["args"] = dict(event.data, path=event.path)
+            self.trace_events.append(trace_event)
+
+    def dump(self, fp: IO[str]) -> None:
+        with self._lock:
+            json.dump(
+                {
+                    "traceEvents": self.trace_events,
+                    "displayTimeUnit": "ms",
+                    "metadata": {"pathHistograms": self.histograms.to_json()},
+                },
+                fp,
+                default=repr,
+            )
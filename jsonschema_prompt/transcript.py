@@ -0,0 +1,182 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+import json
+import time
+from typing import Any, Callable, IO, Iterable, List, Optional
+
+from .input import InputHandler, get_plain_text
+from .exceptions import ReplayError
+
+# transcript lines are compact JSON arrays: [kind, message, answer, elapsed, outcome]
+STRING = "s"
+BOOLEAN = "b"
+PRINT = "p"
+
+ANSWERED = None
+EOF = "eof"
+INTERRUPTED = "int"
+
+
+@dataclasses.dataclass(frozen=True)
+class TranscriptEntry:
+    kind: str
+    message: str
+    answer: Any = None
+    elapsed: float = 0.0
+    outcome: Optional[str] = ANSWERED
+
+    def to_json(self) -> list:
+        if self.kind == PRINT:
+            return [self.kind, self.message]
+        entry = [self.kind, self.message, self.answer, round(self.elapsed, 6)]
+        if self.outcome is not ANSWERED:
+            entry.append(self.outcome)
+        return entry
+
+    @classmethod
+    def from_json(cls, data: list) -> "TranscriptEntry":
+        kind, message, *rest = data
+        if kind == PRINT:
+            return cls(kind=kind, message=message)
+        answer, elapsed, *outcome = rest
+        return cls(
+            kind=kind,
+            message=message,
+            answer=answer,
+            elapsed=elapsed,
+            outcome=outcome[0] if outcome else ANSWERED,
+        )
+
+
+class Transcript:
+    def __init__(self, entries: Iterable[TranscriptEntry] = ()) -> None:
+        self.entries: List[TranscriptEntry] = list(entries)
+
+    def append(self, entry: TranscriptEntry) -> None:
+        self.entries.append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def get_prompts(self) -> List[TranscriptEntry]:
+        return [e for e in self.entries if e.kind != PRINT]
+
+    def get_think_time(self) -> float:
+        return sum(e.elapsed for e in self.entries)
+
+    def dump(self, fp: IO[str]) -> None:
+        for entry in self.entries:
+            fp.write(json.dumps(entry.to_json(), separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, fp: IO[str]) -> "Transcript":
+        return cls(
+            TranscriptEntry.from_json(json.loads(line)) for line in fp if line.strip()
+        )
+
+
+def _record(transcript: Transcript, kind: str, handler: Callable) -> Callable:
+    def recording_handler(**kwargs):
+        message = get_plain_text(kwargs.get("message", ""))
+        start = time.perf_counter()
+
+        def append(answer, outcome):
+            transcript.append(
+                TranscriptEntry(
+                    kind=kind,
+                    message=message,
+                    answer=answer,
+                    elapsed=time.perf_counter() - start,
+                    outcome=outcome,
+                )
+            )
+
+        try:
+            answer = handler(**kwargs)
+        except EOFError:
+            append(None, EOF)
+            raise
+        except KeyboardInterrupt:
+            append(None, INTERRUPTED)
+            raise
+        append(answer, ANSWERED)
+        return answer
+
+    return recording_handler
+
+
+def record_input_handler(
+    input_handler: InputHandler, transcript: Transcript
+) -> InputHandler:
+    def print_handler(message):
+        transcript.append(TranscriptEntry(kind=PRINT, message=get_plain_text(message)))
+        return input_handler.print_handler(message)
+
+    return dataclasses.replace(
+        input_handler,
+        str_handler=_record(transcript, STRING, input_handler.str_handler),
+        bool_handler=_record(transcript, BOOLEAN, input_handler.bool_handler),
+        print_handler=print_handler,
+    )
+
+
+def replay_input_handler(
+    input_handler: InputHandler, transcript: Transcript, *, strict: bool = True
+) -> InputHandler:
+    # answers from the transcript, with the rest of the handler (bulk_items,
+    # validate_while_typing, ...) as it was recorded with, so the prompts match
+    prompts = iter(transcript.get_prompts())
+
+    def next_entry(kind: str, message: str) -> TranscriptEntry:
+        entry = next(prompts, None)
+        if entry is None:
+            raise ReplayError(f"Transcript exhausted at prompt {message!r}")
+        if entry.kind != kind:
+            raise ReplayError(
+                f"Expected a {entry.kind!r} prompt, got {kind!r} prompt {message!r}"
+            )
+        if strict and entry.message != message:
+            raise ReplayError(f"Expected prompt {entry.message!r}, got {message!r}")
+        if entry.outcome == EOF:
+            raise EOFError
+        if entry.outcome == INTERRUPTED:
+            raise KeyboardInterrupt
+        return entry
+
+    def str_handler(*, message, validator=None, **kwargs):
+        entry = next_entry(STRING, get_plain_text(message))
+        if validator is not None:
+            from prompt_toolkit.document import Document
+            from prompt_toolkit.validation import ValidationError
+
+            try:
+                validator.validate(Document(entry.answer))
+            except ValidationError as e:
+                raise ReplayError(
+                    f"Recorded answer {entry.answer!r} to {entry.message!r} "
+                    f"is no longer valid: {e.message}"
+                )
+        return entry.answer
+
+    def bool_handler(*, message, **kwargs):
+        return next_entry(BOOLEAN, get_plain_text(message)).answer
+
+    return dataclasses.replace(
+        input_handler, str_handler=str_handler, bool_handler=bool_handler
+    )
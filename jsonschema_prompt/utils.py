@@ -12,12 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import itertools
 
-import prompt_toolkit
-
-from .input import InputHandler
-
 ALL_JSON_TYPES = [
     "array",
     "boolean",
@@ -33,11 +30,43 @@ def multiline_continuation(width: int, line_number: int, is_soft_wrap: bool):
     return "." * width
 
 
-def find_types_in_schema(schema):
+def get_shallow_schema(schema):
+    # the schema's own keywords, with the subschemas that only apply to
+    # properties and items replaced by true, so a value whose children have
+    # already been validated is checked in time proportional to its own size
+    if not isinstance(schema, dict):
+        return schema
+    shallow_schema = dict(schema)
+    if shallow_schema.get("additionalProperties") is False:
+        # which properties are additional still depends on the names
+        for keyword in ("properties", "patternProperties"):
+            if keyword in schema:
+                shallow_schema[keyword] = {name: True for name in schema[keyword]}
+    else:
+        shallow_schema.pop("properties", None)
+        shallow_schema.pop("patternProperties", None)
+        shallow_schema.pop("additionalProperties", None)
+    items = schema.get("items")
+    if isinstance(items, list):
+        shallow_schema["items"] = [True] * len(items)
+    else:
+        shallow_schema.pop("items", None)
+    if isinstance(schema.get("additionalItems"), dict):
+        del shallow_schema["additionalItems"]
+    return shallow_schema
+
+
+def find_types_in_schema(schema, resolver=None):
+    if resolver is not None:
+        schema = resolver.resolve(schema)
     if not schema:
         return ()
     if isinstance(schema, (list, tuple)):
-        return list(itertools.chain(find_types_in_schema(s) for s in schema))
+        return list(
+            itertools.chain.from_iterable(
+                find_types_in_schema(s, resolver) for s in schema
+            )
+        )
     if "type" in schema:
         if isinstance(schema["type"], str):
             return [schema["type"]]
@@ -46,18 +75,26 @@ def find_types_in_schema(schema):
     types = set()
     if "allOf" in schema:
         for subschema in schema["allOf"]:
-            types.update(find_types_in_schema(subschema))
-    # TODO: determine the semantics for types found within oneOf, anyOf, if/then/else
-    return list(types)
+            types.update(find_types_in_schema(subschema, resolver))
+    types = list(types)
+    # a value of any of the branches' types can be entered
+    for keyword in ("oneOf", "anyOf"):
+        if keyword in schema and not types:
+            branch_types = (find_types_in_schema(s, resolver) for s in schema[keyword])
+            types = list(dict.fromkeys(itertools.chain.from_iterable(branch_types)))
+    # TODO: determine the semantics for types found within if/then/else
+    return types
+
 
+@functools.lru_cache(maxsize=64)
+def _get_type_completer(types):
+    from prompt_toolkit.completion import WordCompleter
 
-_ANY_TYPE_COMPLETER = prompt_toolkit.completion.WordCompleter(
-    ALL_JSON_TYPES, ignore_case=True
-)
+    return WordCompleter(list(types), ignore_case=True)
 
 
 def get_type_completer(types):
     if not types:
-        return _ANY_TYPE_COMPLETER
+        return _get_type_completer(tuple(ALL_JSON_TYPES))
     else:
-        return prompt_toolkit.completion.WordCompleter(types, ignore_case=True)
+        return _get_type_completer(tuple(types))
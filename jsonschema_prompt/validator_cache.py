@@ -0,0 +1,104 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import json
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from .types import SchemaType
+
+
+def get_canonical_json(schema: SchemaType) -> str:
+    return json.dumps(
+        schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=repr
+    )
+
+
+def get_fingerprint(canonical_json: str) -> str:
+    import hashlib
+
+    return hashlib.sha1(canonical_json.encode("utf-8")).hexdigest()
+
+
+def schema_fingerprint(schema: SchemaType) -> str:
+    return get_fingerprint(get_canonical_json(schema))
+
+
+class ValidatorCache:
+    def __init__(self, maxsize: Optional[int] = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        factory: Callable[[SchemaType], Any],
+        schema: SchemaType,
+        *,
+        namespace: Hashable = None,
+    ) -> Any:
+        # validators built by different factories (or against different
+        # root documents) are kept apart by the namespace
+        if namespace is None:
+            namespace = factory
+        key = (namespace, schema_fingerprint(schema))
+        with self._lock:
+            validator = self._entries.get(key)
+            if validator is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return validator
+            self.misses += 1
+        # build outside the lock so a slow compile doesn't serialize other threads;
+        # a concurrent miss on the same key at worst builds an equivalent validator twice
+        validator = factory(schema)
+        with self._lock:
+            self._entries[key] = validator
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return validator
+
+    def get_factory(
+        self, factory: Callable[[SchemaType], Any], *, namespace: Hashable = None
+    ) -> Callable[[SchemaType], Any]:
+        def cached_factory(schema):
+            return self.get(factory, schema, namespace=namespace)
+
+        return cached_factory
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+DEFAULT_VALIDATOR_CACHE = ValidatorCache()
@@ -17,20 +17,38 @@ import sys
 import collections
 import itertools
 import string
+import threading
+import time
 from dataclasses import dataclass
 from typing import Callable
 
-import jsonschema
-
 from prompt_toolkit.validation import Validator, ValidationError
 
 from .utils import ALL_JSON_TYPES
+from .events import VALIDATION_RUN, VALIDATION_FAILED
+from .enum_index import MISSING
 
 
 class JSONSchemaValidator(Validator):
-    def __init__(self, schema, *, validator_factory):
+    def __init__(
+        self,
+        schema,
+        *,
+        validator_factory,
+        live=False,
+        debounce=0.15,
+        cache_size=64,
+        emit=None,
+    ):
         self.schema = schema
         self.validator = validator_factory(self.schema)
+        self.live = live
+        self.debounce = debounce
+        self.cache_size = cache_size
+        self.emit = emit
+        # (text, first_error_only) -> error message, or None if valid
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
 
     def get_json(self, document):
         try:
@@ -38,11 +56,53 @@ class JSONSchemaValidator(Validator):
         except json.JSONDecodeError as e:
             raise ValidationError(message=str(e))
 
+    def _get_error_message(self, document, first_error_only):
+        key = (document.text, first_error_only)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                message = self._results[key]
+                if message is not None:
+                    raise ValidationError(message=message)
+                return
+        start = time.perf_counter_ns()
+        try:
+            obj = self.get_json(document)
+        except ValidationError as e:
+            message = e.message
+        else:
+            errors = self.validator.iter_errors(obj)
+            if first_error_only:
+                errors = itertools.islice(errors, 1)
+            message = "\n".join(e.message for e in errors) or None
+        if self.emit is not None:
+            duration_ns = time.perf_counter_ns() - start
+            self.emit(VALIDATION_RUN, duration_ns=duration_ns, live=first_error_only)
+            if message is not None:
+                self.emit(VALIDATION_FAILED, errors=[message], live=first_error_only)
+        with self._lock:
+            self._results[key] = message
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        if message is not None:
+            raise ValidationError(message=message)
+
     def validate(self, document):
-        obj = self.get_json(document)
-        errors = [e.message for e in self.validator.iter_errors(obj)]
-        if errors:
-            raise ValidationError(message="\n".join(errors))
+        # accepting the input always reports every error
+        self._get_error_message(document, False)
+
+    async def validate_async(self, document):
+        if not self.live:
+            return self.validate(document)
+        import asyncio
+        from prompt_toolkit.eventloop import run_in_executor_with_context
+
+        # prompt_toolkit re-runs validation if the text changed while this was
+        # waiting, so keystrokes during the sleep coalesce into one check
+        await asyncio.sleep(self.debounce)
+        await run_in_executor_with_context(
+            lambda: self._get_error_message(document, True)
+        )
 
 
 class StringJSONSchemaValidator(JSONSchemaValidator):
@@ -50,6 +110,52 @@ class StringJSONSchemaValidator(JSONSchemaValidator):
         return document.text
 
 
+class EnumValidator(Validator):
+    def __init__(self, index, *, schema_validator=None):
+        self.index = index
+        # checks any keywords besides the enum itself
+        self.schema_validator = schema_validator
+
+    def validate(self, document):
+        value = self.index.lookup(document.text)
+        if value is MISSING:
+            message = "Must be one of the allowed values"
+            suggestions = self.index.get_suggestions(document.text)
+            if suggestions:
+                message += f" (did you mean {', '.join(map(repr, suggestions))}?)"
+            raise ValidationError(message=message, cursor_position=len(document.text))
+        if self.schema_validator is not None:
+            errors = [e.message for e in self.schema_validator.iter_errors(value)]
+            if errors:
+                raise ValidationError(message="\n".join(errors))
+
+
+class BulkItemsValidator(Validator):
+    def __init__(self, parse, check):
+        self._parse = parse
+        self.check = check
+        self._parsed_text = None
+        self._parsed_items = None
+
+    def parse(self, text):
+        # the accepted text was already parsed during validation
+        if text != self._parsed_text:
+            self._parsed_items = self._parse(text)
+            self._parsed_text = text
+        return self._parsed_items
+
+    def validate(self, document):
+        if not document.text.strip():
+            return
+        try:
+            items = self.parse(document.text)
+        except ValueError as e:
+            raise ValidationError(message=str(e))
+        errors = self.check(items)
+        if errors:
+            raise ValidationError(message="\n".join(errors))
+
+
 _ANY_TYPE_VALIDATOR = Validator.from_callable(
     lambda text: text in ALL_JSON_TYPES,
     error_message="Invalid type",
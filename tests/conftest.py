@@ -0,0 +1,32 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from jsonschema_prompt import prompt
+from jsonschema_prompt.testing import ScriptedAnswers
+from jsonschema_prompt.validator_cache import ValidatorCache
+
+
+@pytest.fixture
+def prompt_answers():
+    # prompt() for the schema with scripted answers, all of which must be used
+    def prompt_answers(schema, answers, **kwargs):
+        scripted = ScriptedAnswers(answers)
+        kwargs.setdefault("validator_cache", ValidatorCache())
+        value = prompt(schema, input_handler=scripted.input_handler, **kwargs)
+        assert not scripted.answers
+        return value, scripted
+
+    return prompt_answers
@@ -0,0 +1,66 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+
+import pytest
+
+from jsonschema_prompt import schema_cache
+from jsonschema_prompt.backends import JSONSCHEMA_BACKEND, ValidationBackend
+
+pytest.importorskip("fastjsonschema")
+
+from jsonschema_prompt.backends import FastjsonschemaBackend  # noqa: E402
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setattr(schema_cache, "_signing_key", None)
+    return str(tmp_path / "cache")
+
+
+def test_backend_must_create_validators():
+    with pytest.raises(TypeError):
+        ValidationBackend()
+
+
+def test_tampered_source_is_not_executed(cache_dir):
+    schema = {"type": "string", "maxLength": 3}
+    FastjsonschemaBackend(cache_dir=cache_dir).create_validator(schema)
+    (source_path,) = pathlib.Path(cache_dir).glob("validators/*/*.py")
+    source_path.write_bytes(
+        source_path.read_bytes().replace(b"def validate(", b"def _validate(", 1)
+        + b"\ndef validate(data, **kwargs):\n    return data\n"
+    )
+
+    validator = FastjsonschemaBackend(cache_dir=cache_dir).create_validator(schema)
+    assert not validator.is_valid("toolong")
+
+
+@pytest.mark.parametrize(
+    "schema, instance",
+    [
+        ({"format": "email"}, "nope"),
+        ({"format": "email"}, "user@example.com"),
+        ({"format": "ipv4"}, "1.2.3.999"),
+        ({"format": "date-time"}, "not a date"),
+        ({"format": "date"}, "2022-02-30"),
+        ({"format": "json-pointer"}, "no-slash"),
+    ],
+)
+def test_formats_match_jsonschema(cache_dir, schema, instance):
+    backend = FastjsonschemaBackend(cache_dir=cache_dir)
+    expected = JSONSCHEMA_BACKEND.create_validator(schema).is_valid(instance)
+    assert backend.create_validator(schema).is_valid(instance) == expected
@@ -0,0 +1,119 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+
+from jsonschema_prompt.branch_prompter import _merge_branch
+from jsonschema_prompt.sinks import NDJSONSink
+
+ANY_OR_SHORT = {
+    "oneOf": [
+        {"type": "string", "title": "any"},
+        {"type": "string", "maxLength": 3, "title": "short"},
+    ]
+}
+
+
+def was_reset(scripted):
+    return any("Value has been reset" in message for message in scripted.printed)
+
+
+def test_one_of_value_matching_two_branches_is_rejected(prompt_answers):
+    schema = {"type": "object", "properties": {"v": ANY_OR_SHORT}, "required": ["v"]}
+    value, scripted = prompt_answers(
+        schema, ["any", "ab", "any", "abcd", EOFError]
+    )
+    assert value == {"v": "abcd"}
+    assert was_reset(scripted)
+
+
+def test_one_of_root_array_is_checked_before_it_is_written(prompt_answers):
+    schema = {
+        "oneOf": [
+            {"type": "array", "items": {"type": "string"}, "title": "any"},
+            {"type": "array", "items": {"type": "string"}, "maxItems": 1},
+        ]
+    }
+    fp = io.StringIO()
+    value, scripted = prompt_answers(
+        schema,
+        ["any", "a", EOFError, "any", "a", "b", EOFError],
+        sink=NDJSONSink(fp),
+    )
+    assert value == ["a", "b"]
+    assert was_reset(scripted)
+    assert [json.loads(line) for line in fp.getvalue().splitlines()] == [["a", "b"]]
+
+
+def test_branch_keywords_are_checked_with_the_outer_ones(prompt_answers):
+    schema = {
+        "type": "object",
+        "properties": {"n": {"type": "integer", "maximum": 10}},
+        "required": ["n"],
+        "anyOf": [
+            {"title": "a", "properties": {"n": {"maximum": 100}}},
+            {"title": "b", "properties": {"n": {"minimum": 0}}},
+        ],
+    }
+    value, scripted = prompt_answers(schema, ["a", "50", "7", EOFError])
+    assert value == {"n": 7}
+    assert [answer for answer, _ in scripted.rejected] == ["50"]
+
+
+def test_merge_branch_keeps_conflicting_outer_keywords():
+    schema = {
+        "type": ["string", "integer"],
+        "not": {"const": "x"},
+        "title": "outer",
+        "oneOf": [],
+    }
+    branch = {"type": "string", "not": {"const": "y"}, "title": "branch"}
+    assert _merge_branch(schema, "oneOf", branch) == {
+        "type": "string",
+        "not": {"const": "y"},
+        "title": "branch",
+        "allOf": [{"type": ["string", "integer"]}, {"not": {"const": "x"}}],
+    }
+
+
+def test_branch_properties_do_not_loosen_outer_additional_properties(
+    prompt_answers,
+):
+    schema = {
+        "type": "object",
+        "properties": {"kind": {"type": "string"}},
+        "additionalProperties": False,
+        "anyOf": [
+            {
+                "properties": {"kind": {"const": "a"}, "x": {"type": "string"}},
+                "required": ["kind"],
+            },
+            {"properties": {"kind": {"const": "b"}}, "required": ["kind"]},
+        ],
+    }
+    value, scripted = prompt_answers(
+        schema, ["a", "hello", EOFError, EOFError, EOFError]
+    )
+    assert value == {"kind": "a"}
+    assert any("'x' was unexpected" in message for message in scripted.printed)
+
+
+def test_merge_branch_keeps_outer_additional_items_with_its_items():
+    schema = {"items": [{"type": "string"}], "additionalItems": False, "anyOf": []}
+    branch = {"items": [{"type": "string"}, {"type": "integer"}]}
+    assert _merge_branch(schema, "anyOf", branch) == {
+        "items": [{"type": "string"}, {"type": "integer"}],
+        "allOf": [{"items": [{"type": "string"}], "additionalItems": False}],
+    }
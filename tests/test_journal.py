@@ -0,0 +1,67 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from jsonschema_prompt.events import Event, NODE_EXIT
+from jsonschema_prompt.journal import Journal, load_journal
+
+
+def _completed(path, value):
+    return Event(NODE_EXIT, path, path, 0, data={"status": "ok"}, value=value)
+
+
+def _resume_and_complete(path, pointer, value):
+    journal = Journal.open(str(path), append=True)
+    journal(_completed(pointer, value))
+    journal.close()
+
+
+def test_resume_after_truncated_record(tmp_path):
+    path = tmp_path / "session.journal"
+    path.write_text('{"p":"/a","v":1}\n{"p":"/b","v')
+    assert load_journal(str(path)) == {"/a": 1}
+
+    _resume_and_complete(path, "/c", 3)
+    assert load_journal(str(path)) == {"/a": 1, "/c": 3}
+
+    _resume_and_complete(path, "/d", 4)
+    assert load_journal(str(path)) == {"/a": 1, "/c": 3, "/d": 4}
+
+
+def test_resume_after_record_missing_newline(tmp_path):
+    path = tmp_path / "session.journal"
+    path.write_text('{"p":"/a","v":1}\n{"p":"/b","v":2}')
+
+    _resume_and_complete(path, "/c", 3)
+    assert load_journal(str(path)) == {"/a": 1, "/b": 2, "/c": 3}
+
+
+def test_resume_after_only_a_truncated_record(tmp_path):
+    path = tmp_path / "session.journal"
+    path.write_text('{"p":"/a"')
+
+    _resume_and_complete(path, "/c", 3)
+    assert path.read_text() == '{"p":"/c","v":3}\n'
+
+
+def test_rejected_duplicate_item_is_not_resumed(tmp_path, prompt_answers):
+    path = tmp_path / "session.journal"
+    schema = {"type": "array", "items": {"type": "integer"}, "uniqueItems": True}
+    journal = Journal.open(str(path))
+    # the session ends before the duplicate is re-entered
+    with pytest.raises(AssertionError, match="no answers left"):
+        prompt_answers(schema, ["1", "1"], hooks=[journal])
+    journal.close()
+    assert load_journal(str(path)) == {"/0": 1}
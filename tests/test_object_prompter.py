@@ -0,0 +1,46 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from jsonschema_prompt import compile
+
+
+def test_true_pattern_property_allows_any_value(prompt_answers):
+    schema = {
+        "type": "object",
+        "patternProperties": {"^x-": True},
+        "additionalProperties": False,
+    }
+    value, _ = prompt_answers(schema, ["x-a", "string", "hello", EOFError])
+    assert value == {"x-a": "hello"}
+    object_data = compile(schema).root.object_data
+    # planned as a schema allowing any value, so names can be entered for it
+    assert [s for _, s in object_data.pattern_properties] == [{}]
+    assert object_data.property_name_schema is not None
+
+
+def test_false_pattern_property_forbids_the_name(prompt_answers):
+    schema = {"type": "object", "patternProperties": {"^x-": False}}
+    value, scripted = prompt_answers(schema, ["x-a", "y", "string", "v", EOFError])
+    assert value == {"y": "v"}
+    assert "Property 'x-a' is not allowed" in scripted.printed[0]
+
+
+def test_only_false_pattern_properties_allow_no_names(prompt_answers):
+    schema = {
+        "type": "object",
+        "patternProperties": {"^x-": False},
+        "additionalProperties": False,
+    }
+    value, _ = prompt_answers(schema, [])
+    assert value == {}
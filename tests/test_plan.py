@@ -0,0 +1,42 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from jsonschema_prompt.plan import StaticValues
+from jsonschema_prompt.refs import SchemaResolver
+
+
+def test_static_values_are_not_reused_for_a_new_schema():
+    # each schema is freed before the next, so the next can get its id
+    static_values = StaticValues()
+    for _ in range(100):
+        assert static_values.get({"type": "null"}) == (None,)
+        assert static_values.get({"type": ["null", "string"]}) is None
+
+
+def test_static_values_are_bounded():
+    static_values = StaticValues(max_size=10)
+    schemas = [{"const": i} for i in range(100)]
+    for i, schema in enumerate(schemas):
+        assert static_values.get(schema) == (i,)
+    assert len(static_values._values) <= 10
+
+
+def test_recursive_schema_is_not_static():
+    schema = {
+        "type": "object",
+        "properties": {"child": {"$ref": "#"}},
+        "required": ["child"],
+        "additionalProperties": False,
+    }
+    assert StaticValues(SchemaResolver(schema), max_size=1).get(schema) is None
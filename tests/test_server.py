@@ -0,0 +1,154 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+from jsonschema_prompt.server import PromptServer
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 2},
+        "count": {"type": "integer"},
+    },
+    "required": ["name", "count"],
+    "additionalProperties": False,
+}
+
+
+def run(coroutine_function, **kwargs):
+    async def main():
+        server = PromptServer({"config": SCHEMA}, **kwargs)
+        try:
+            return await asyncio.wait_for(coroutine_function(server), timeout=10)
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_session():
+    async def session(server):
+        client = await server.connect_local()
+        await client.start("config")
+        prompts = []
+        for answer in ["x", "xy", "3"]:
+            message = await client.receive_prompt()
+            if message["type"] == "invalid":
+                prompts.append(message)
+                message = await client.receive_prompt()
+            prompts.append(message)
+            await client.answer(answer)
+        result = await client.receive_prompt()
+        await client.close()
+        return prompts, result
+
+    prompts, result = run(session)
+    assert [message["type"] for message in prompts] == [
+        "prompt",
+        "invalid",
+        "prompt",
+        "prompt",
+    ]
+    assert result == {"type": "done", "value": {"name": "xy", "count": 3}}
+
+
+def test_concurrent_sessions():
+    async def session(server, name):
+        client = await server.connect_local()
+        await client.start()
+        await client.receive_prompt()
+        await client.answer(name)
+        await client.receive_prompt()
+        await client.answer("1")
+        result = await client.receive_prompt()
+        await client.close()
+        return result["value"]
+
+    async def sessions(server):
+        names = [f"session{i}" for i in range(8)]
+        values = await asyncio.gather(*(session(server, name) for name in names))
+        return names, values
+
+    names, values = run(sessions)
+    assert [value["name"] for value in values] == names
+
+
+@pytest.mark.parametrize(
+    "start",
+    [
+        {"set_values": ["bad"]},
+        {"set_values": {"name": "no leading slash"}},
+        {"schema": 3},
+        {"schema": "unknown"},
+        {"accept_defaults": "yes"},
+        {"other": True},
+    ],
+)
+def test_invalid_start_message(start):
+    async def session(server):
+        client = await server.connect_local()
+        await client._send(start)
+        result = await client.receive()
+        closed = await client.receive()
+        await client.close()
+        return result, closed
+
+    result, closed = run(session)
+    assert result["type"] == "error"
+    assert closed is None
+
+
+def test_set_value_error():
+    async def session(server):
+        client = await server.connect_local()
+        await client.start(set_values={"/name": "x"})
+        result = await client.receive_prompt()
+        await client.close()
+        return result
+
+    result = run(session)
+    assert result["type"] == "error"
+    assert "/name" in result["message"]
+
+
+def test_sessions_over_the_limit_are_rejected():
+    async def sessions(server):
+        clients = [await server.connect_local() for _ in range(3)]
+        for client in clients[:2]:
+            await client.start()
+            assert (await client.receive_prompt())["type"] == "prompt"
+        rejected = await clients[2].receive()
+        for client in clients:
+            await client.close()
+        return rejected
+
+    rejected = run(sessions, max_sessions=2)
+    assert rejected["type"] == "error"
+    assert "full" in rejected["message"]
+
+
+def test_server_options_apply_to_sessions():
+    async def session(server):
+        client = await server.connect_local()
+        # the client's set values override the server's
+        await client.start(set_values={"/count": 5})
+        result = await client.receive_prompt()
+        await client.close()
+        return result
+
+    result = run(session, set_values={"/name": "ab", "/count": 1})
+    assert result == {"type": "done", "value": {"name": "ab", "count": 5}}
@@ -0,0 +1,39 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+
+import pytest
+
+from jsonschema_prompt.sinks import OutputSink, get_sink
+
+
+def test_output_sink_requires_write():
+    class Sink(OutputSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Sink(io.StringIO())
+
+
+@pytest.mark.parametrize(
+    "format, output",
+    [("ndjson", '1\n{"a": 2}\n'), ("json-array", '[\n1,\n{"a": 2}\n]\n')],
+)
+def test_sink_formats(format, output):
+    fp = io.StringIO()
+    with get_sink(fp, format) as sink:
+        sink.write(1)
+        sink.write({"a": 2})
+    assert fp.getvalue() == output
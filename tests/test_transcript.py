@@ -0,0 +1,69 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import dataclasses
+
+import pytest
+
+from jsonschema_prompt import prompt
+from jsonschema_prompt.exceptions import ReplayError
+from jsonschema_prompt.testing import ScriptedAnswers
+from jsonschema_prompt.transcript import (
+    Transcript,
+    record_input_handler,
+    replay_input_handler,
+)
+from jsonschema_prompt.validator_cache import ValidatorCache
+
+SCHEMA = {"type": "array", "items": {"type": "integer"}}
+
+
+def bulk_input_handler(answers):
+    return dataclasses.replace(ScriptedAnswers(answers).input_handler, bulk_items=True)
+
+
+def test_replay_keeps_bulk_items():
+    transcript = Transcript()
+    recorded = prompt(
+        SCHEMA,
+        input_handler=record_input_handler(
+            bulk_input_handler(["[1, 2]", EOFError]), transcript
+        ),
+        validator_cache=ValidatorCache(),
+    )
+    replayed = prompt(
+        SCHEMA,
+        input_handler=replay_input_handler(bulk_input_handler([]), transcript),
+        validator_cache=ValidatorCache(),
+    )
+    assert recorded == replayed == [1, 2]
+
+
+def test_replay_without_bulk_items_differs():
+    transcript = Transcript()
+    prompt(
+        SCHEMA,
+        input_handler=record_input_handler(
+            bulk_input_handler(["[1, 2]", EOFError]), transcript
+        ),
+        validator_cache=ValidatorCache(),
+    )
+    with pytest.raises(ReplayError):
+        prompt(
+            SCHEMA,
+            input_handler=replay_input_handler(
+                ScriptedAnswers([]).input_handler, transcript
+            ),
+            validator_cache=ValidatorCache(),
+        )
@@ -0,0 +1,91 @@
+# Copyright 2022 Ben Kehoe
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from jsonschema_prompt.exceptions import PromptValidationError
+
+# each case runs with each object and array validated whole, and with
+# shallow validation, which trusts the values beneath them
+VALIDATION_MODES = [{}, {"shallow_validation": True}]
+
+
+def was_reset(scripted):
+    return any("Object has been reset" in message for message in scripted.printed)
+
+
+@pytest.mark.parametrize("kwargs", VALIDATION_MODES)
+def test_boolean_is_validated(prompt_answers, kwargs):
+    schema = {
+        "type": "object",
+        "properties": {"flag": {"type": "boolean", "not": {"const": False}}},
+        "required": ["flag"],
+    }
+    value, scripted = prompt_answers(schema, [False, True, EOFError], **kwargs)
+    assert value == {"flag": True}
+    assert not was_reset(scripted)
+
+
+@pytest.mark.parametrize("kwargs", VALIDATION_MODES)
+def test_listed_property_is_validated_against_matching_patterns(
+    prompt_answers, kwargs
+):
+    schema = {
+        "type": "object",
+        "properties": {"x-a": {"type": "string"}},
+        "patternProperties": {"^x-": {"maxLength": 2}},
+        "required": ["x-a"],
+        "additionalProperties": False,
+    }
+    value, scripted = prompt_answers(schema, ["toolong", "ok", EOFError], **kwargs)
+    assert value == {"x-a": "ok"}
+    assert [answer for answer, _ in scripted.rejected] == ["toolong"]
+    assert not was_reset(scripted)
+
+
+@pytest.mark.parametrize("kwargs", VALIDATION_MODES)
+def test_false_pattern_forbids_listed_property(prompt_answers, kwargs):
+    schema = {
+        "type": "object",
+        "properties": {"x-a": {"type": "string"}, "b": {"type": "string"}},
+        "patternProperties": {"^x-": False},
+        "additionalProperties": False,
+    }
+    value, _ = prompt_answers(schema, ["v"], **kwargs)
+    assert value == {"b": "v"}
+
+
+@pytest.mark.parametrize("kwargs", VALIDATION_MODES)
+def test_invalid_const_is_an_error(prompt_answers, kwargs):
+    schema = {
+        "type": "object",
+        "properties": {"a": {"type": "string", "const": 1}},
+        "required": ["a"],
+    }
+    with pytest.raises(PromptValidationError):
+        prompt_answers(schema, [], **kwargs)
+
+
+def test_shallow_validation_still_checks_own_keywords(prompt_answers):
+    schema = {
+        "type": "object",
+        "properties": {"a": {"type": "string"}, "b": {"type": "string"}},
+        "minProperties": 2,
+        "additionalProperties": False,
+    }
+    value, scripted = prompt_answers(
+        schema, ["x", EOFError, "x", "y"], shallow_validation=True
+    )
+    assert value == {"a": "x", "b": "y"}
+    assert was_reset(scripted)